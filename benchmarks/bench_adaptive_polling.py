@@ -0,0 +1,138 @@
+"""
+Simulate a day of polling with fixed intervals and the adaptive scheduler.
+
+A simulated panel is armed away in the morning and disarmed in the evening,
+armed stay at night, and sees doors open and close in between. Polls and
+commands run on a virtual clock through the real scheduler delay logic, so
+the run takes no time. Every request takes a random time to answer, like
+the portal does, so polls do not stay in step with the exit delays. Reports
+the requests made and how late polls saw the changes, overall and for the
+end of the exit delays.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_adaptive_polling.py
+"""
+import bisect
+import random
+import statistics
+
+from pyadtpulsedotcom.polling import AdaptivePollScheduler, PollScheduler
+
+DAY = 24 * 3600
+EXIT_DELAY = 60
+# Seconds the portal takes to answer a request
+LATENCY = (0.2, 1.5)
+DISARMED = 'Disarmed.\xa0All Quiet.'
+
+
+def timeline(seed=1):
+    """
+    Build the panel history.
+
+    :return: Sorted (time, state, open zones, is exit delay end) tuples,
+        and the times commands were sent
+    """
+    rng = random.Random(seed)
+    changes = [(0, DISARMED, 0, False)]
+    commands = []
+    for hour, armed, arming in (
+            (8, 'Armed Away.\xa0All Quiet.',
+             'Arming Away.\xa0Exit delay in progress.'),
+            (18, DISARMED, None),
+            (23, 'Armed Stay.\xa0All Quiet.',
+             'Arming Stay.\xa0Exit delay in progress.')):
+        sent = hour * 3600 + rng.uniform(0, 3600)
+        commands.append(sent)
+        if arming is None:
+            changes.append((sent, armed, 0, False))
+        else:
+            changes.append((sent, arming, 0, False))
+            changes.append((sent + EXIT_DELAY, armed, 0, True))
+    for _ in range(20):
+        # A door opened for a minute or two while disarmed.
+        opened = rng.uniform(18.5 * 3600, 22.5 * 3600)
+        changes.append((opened, DISARMED, 1, False))
+        changes.append((opened + rng.uniform(60, 120), DISARMED, 0, False))
+    changes.sort()
+    return changes, commands
+
+
+class SimClient(object):
+    """What the scheduler reads from a client."""
+
+    def __init__(self):
+        self.state = None
+        self.last_command = 0
+        self.last_change = 0
+
+
+def simulate(scheduler, changes, commands, seed=2):
+    rng = random.Random(seed)
+    times = [change[0] for change in changes]
+    client = SimClient()
+    seen = None
+    last_poll = -1
+    requests = 0
+    latencies = []
+    exit_latencies = []
+
+    def poll(now):
+        """Poll at now, return when the answer was in."""
+        nonlocal seen, last_poll, requests
+        requests += 1
+        # The portal renders the page halfway through the request.
+        latency = rng.uniform(*LATENCY)
+        rendered = now + latency / 2
+        now += latency
+        index = bisect.bisect_right(times, rendered) - 1
+        for time, _, _, exit_end in changes[
+                bisect.bisect_right(times, last_poll):index + 1]:
+            latencies.append(now - time)
+            if exit_end:
+                exit_latencies.append(now - time)
+        current = changes[index][1:3]
+        if current != seen:
+            client.last_change = now
+            seen = current
+        client.state = current[0]
+        last_poll = rendered
+        return now
+
+    next_poll = 0
+    pending = list(commands)
+    while next_poll < DAY:
+        if pending and pending[0] <= next_poll:
+            now = pending.pop(0)
+            client.last_command = now
+            # The command post, then the update _send makes.
+            requests += 1
+            now = poll(now + rng.uniform(*LATENCY))
+            next_poll = min(next_poll, now + scheduler.delay(client, now))
+            continue
+        now = poll(next_poll)
+        next_poll = now + scheduler.delay(client, now)
+    return requests, latencies, exit_latencies
+
+
+def main():
+    changes, commands = timeline()
+    schedulers = [
+        ('fixed 10s', PollScheduler(10)),
+        ('fixed 30s', PollScheduler(30)),
+        ('fixed 60s', PollScheduler(60)),
+        ('adaptive 5-60s', AdaptivePollScheduler(5, 60)),
+        ('adaptive 5-300s', AdaptivePollScheduler(5, 300)),
+    ]
+    print('{:<16} {:>9} {:>10} {:>10} {:>12}'.format(
+        'scheduler', 'requests', 'mean lag', 'max lag', 'exit end lag'))
+    for name, scheduler in schedulers:
+        requests, latencies, exit_latencies = simulate(
+            scheduler, changes, commands)
+        print('{:<16} {:>9} {:>9.1f}s {:>9.1f}s {:>11.1f}s'.format(
+            name, requests, statistics.mean(latencies), max(latencies),
+            max(exit_latencies)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Time the client end to end over recorded portal scenarios.
+
+Each scenario from tests/fixtures is replayed in memory, so the numbers
+cover the client itself: login, redirects, parsing and retries, without
+any network.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_client.py
+"""
+import asyncio
+import os
+import time
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.retry import RetryPolicy
+from pyadtpulsedotcom.transport import ReplayTransport
+
+ROUNDS = 200
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, 'tests',
+                        'fixtures')
+
+
+def scenario(name):
+    return os.path.join(FIXTURES, 'scenario_{}.json'.format(name))
+
+
+async def run(name, steps):
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = None
+    transport = ReplayTransport.load(scenario(name))
+    client = AdtPulsedotcom('user', 'pass', transport=transport,
+                            retry_policy=RetryPolicy(base_delay=0))
+    for step in steps:
+        await step(client)
+    return len(transport.requests)
+
+
+async def main():
+    scenarios = [
+        ('login', [AdtPulsedotcom.async_update]),
+        ('session_expired', [AdtPulsedotcom.async_update] * 2),
+        ('arm_away', [AdtPulsedotcom.async_login,
+                      AdtPulsedotcom.async_alarm_arm_away]),
+        ('version_rolled', [AdtPulsedotcom.async_update] * 2),
+    ]
+    print('{:<16} {:>9} {:>12}'.format('scenario', 'requests', 'ms/round'))
+    for name, steps in scenarios:
+        requests = await run(name, steps)
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await run(name, steps)
+        elapsed = (time.perf_counter() - start) / ROUNDS
+        print('{:<16} {:>9} {:>12.3f}'.format(name, requests, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
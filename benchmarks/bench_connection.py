@@ -0,0 +1,90 @@
+"""
+Handshake savings of the shared, tuned connection pool.
+
+Starts a local TLS server with a throwaway self-signed certificate (needs the
+openssl command) and fetches a small page REQUESTS times, first with a new
+connection per request, as the old requests.get version probe did, then
+over the keep-alive pool from pyadtpulsedotcom.connection.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_connection.py
+"""
+import asyncio
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from pyadtpulsedotcom.connection import tuned_connector
+
+REQUESTS = 200
+BODY = b'<html><body><div id="divOrbTextSummary">Disarmed.</div></body></html>'
+
+
+def make_certificate(directory):
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key, '-out', cert, '-days', '1',
+         '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost'],
+        check=True, capture_output=True)
+    return cert, key
+
+
+async def start_server(cert, key, connections):
+    async def summary(request):
+        connections.add(request.transport.get_extra_info('peername'))
+        return web.Response(body=BODY, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/summary.jsp', summary)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_context.load_cert_chain(cert, key)
+    site = web.TCPSite(runner, 'localhost', 0, ssl_context=server_context)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, 'https://localhost:{}/summary.jsp'.format(port)
+
+
+async def fresh_connections(url, cert):
+    for _ in range(REQUESTS):
+        client_context = ssl.create_default_context(cafile=cert)
+        async with aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(ssl=client_context)) as session:
+            async with session.get(url) as response:
+                await response.read()
+
+
+async def pooled_connections(url, cert):
+    connector = tuned_connector(ssl.create_default_context(cafile=cert))
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for _ in range(REQUESTS):
+            async with session.get(url) as response:
+                await response.read()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        for name, bench in (('fresh', fresh_connections),
+                            ('pooled', pooled_connections)):
+            connections = set()
+            runner, url = await start_server(cert, key, connections)
+            start = time.perf_counter()
+            await bench(url, cert)
+            elapsed = time.perf_counter() - start
+            await runner.cleanup()
+            print('{:<8} {:>8.2f} ms/request {:>6} TLS handshakes'.format(
+                name, elapsed / REQUESTS * 1e3, len(connections)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Per-call coroutine overhead of the native client against the legacy style.
+
+The legacy implementation used @asyncio.coroutine / yield from together with
+async_timeout.timeout(10, loop=loop), which schedules and cancels a timer
+handle on every request. Neither runs on current Python, so the legacy path
+is reproduced here with types.coroutine and an equivalent timer context.
+Both sides issue the same request against a stubbed transport.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_coroutines.py
+"""
+import asyncio
+import time
+import types
+
+from yarl import URL
+
+from pyadtpulsedotcom import AdtPulsedotcom
+
+CALLS = 100000
+CONTEXT_PATH = '/myhome/13.0.0-153'
+
+
+class StubResponse(object):
+    """Minimal stand-in for aiohttp.ClientResponse."""
+
+    status = 200
+    history = ()
+
+    def __init__(self, url):
+        self.url = URL(url)
+
+    async def release(self):
+        pass
+
+
+class StubSession(object):
+    """Transport that answers every request without touching the network."""
+
+    async def request(self, method, url, **kwargs):
+        return StubResponse(url)
+
+
+class LegacyTimeout(object):
+    """Timer handling of async_timeout.timeout(10, loop=loop)."""
+
+    def __init__(self, timeout, loop):
+        self._timeout = timeout
+        self._loop = loop
+        self._handle = None
+
+    def __enter__(self):
+        self._handle = self._loop.call_later(self._timeout, lambda: None)
+        return self
+
+    def __exit__(self, *exc):
+        self._handle.cancel()
+        return False
+
+
+@types.coroutine
+def legacy_rebase(response):
+    """Same contextPath check as _async_rebase, in generator style."""
+    if response.status != 404 and not response.history:
+        return False
+    yield
+    return True
+
+
+@types.coroutine
+def legacy_request(websession, loop, url):
+    """Request as issued by the @asyncio.coroutine implementation."""
+    with LegacyTimeout(10, loop):
+        response = yield from websession.request('GET', url).__await__()
+    if (yield from legacy_rebase(response)):
+        yield from response.release().__await__()
+    yield from response.release().__await__()
+    return response
+
+
+async def bench_legacy(websession):
+    loop = asyncio.get_running_loop()
+    url = AdtPulsedotcom.ADTPULSEDOTCOM_URL + CONTEXT_PATH + \
+        AdtPulsedotcom.DASHBOARD_PATH
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await legacy_request(websession, loop, url)
+    return time.perf_counter() - start
+
+
+async def bench_native(websession):
+    client = AdtPulsedotcom('user', 'pass', websession)
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        response = await client._async_request(
+            'GET', AdtPulsedotcom.DASHBOARD_PATH)
+        await response.release()
+    return time.perf_counter() - start
+
+
+async def main():
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    websession = StubSession()
+    for name, bench in (('legacy', bench_legacy), ('native', bench_native)):
+        elapsed = await bench(websession)
+        print('{:<8} {:>8.2f} us/call'.format(name, elapsed / CALLS * 1e6))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
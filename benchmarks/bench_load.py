@@ -0,0 +1,79 @@
+"""
+Load test the client against the bundled stub portal.
+
+Every simulated account runs its own AdtPulsedotcom in managed mode, so all
+of them share the tuned connection pool, and polls the portal a number of
+times. Reports throughput, poll latency and how many logins, expiries and
+injected errors the run saw.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_load.py --accounts 1000 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.retry import RetryPolicy
+from pyadtpulsedotcom.stub_portal import StubPortal
+
+
+async def account(index, url, polls, interval, latencies, failures):
+    async with AdtPulsedotcom(
+            'user{}'.format(index), 'pass',
+            retry_policy=RetryPolicy(base_delay=0.1)) as client:
+        client.ADTPULSEDOTCOM_URL = url
+        for _ in range(polls):
+            start = time.perf_counter()
+            if await client.async_update():
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures.append(index)
+            await asyncio.sleep(interval)
+
+
+async def main(args):
+    portal = StubPortal(latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate,
+                        session_timeout=args.session_timeout, seed=1)
+    url = await portal.start()
+    latencies = []
+    failures = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[
+            account(index, url, args.polls, args.interval, latencies, failures)
+            for index in range(args.accounts)])
+    finally:
+        await portal.close()
+    elapsed = time.perf_counter() - start
+
+    requests = sum(portal.stats[page] for page in (
+        'signin', 'login', 'summary', 'command', 'keepalive', 'error'))
+    latencies.sort()
+    if not latencies:
+        latencies.append(0)
+    print('accounts {} polls {} in {:.2f}s'.format(
+        args.accounts, args.polls, elapsed))
+    print('requests {} ({:.0f}/s), failed polls {}'.format(
+        requests, requests / elapsed, len(failures)))
+    print('poll latency p50 {:.1f} ms p99 {:.1f} ms'.format(
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000))
+    print('portal: {}'.format(dict(sorted(portal.stats.items()))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--polls', type=int, default=5)
+    parser.add_argument('--interval', type=float, default=0.5)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--session-timeout', type=float, default=600)
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main(parser.parse_args()))
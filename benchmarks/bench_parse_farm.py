@@ -0,0 +1,61 @@
+"""
+Throughput of the ParseFarm at 1, 4 and 8 worker processes.
+
+Two workloads are measured: parse_summary as clients run it, which mostly
+takes the bytes fast path, and a full html.parser DOM parse of every page,
+the CPU-bound case that a single process cannot scale past one core.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_parse_farm.py
+"""
+import asyncio
+import glob
+import os
+import time
+
+from pyadtpulsedotcom.executors import ParseFarm, shutdown_pools
+from pyadtpulsedotcom.parsers import ZONES_TABLE, get_parser, parse_summary
+
+FIXTURES = os.path.join(
+    os.path.dirname(__file__), os.pardir, 'tests', 'fixtures')
+PAGES = 2000
+WORKERS = (1, 4, 8)
+
+
+def full_parse(body):
+    """Build a full DOM, as pages the fast path cannot handle require."""
+    return len(get_parser('html.parser').table_rows(body, ZONES_TABLE))
+
+
+def load_fixtures():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, 'summary_*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+async def throughput(farm, func, bodies):
+    # Warm the pool up so process start-up is not measured.
+    await asyncio.gather(*[farm.run(func, body) for body in bodies[:64]])
+    start = time.perf_counter()
+    await asyncio.gather(*[farm.run(func, body) for body in bodies])
+    return len(bodies) / (time.perf_counter() - start)
+
+
+async def main():
+    fixtures = load_fixtures()
+    bodies = [fixtures[i % len(fixtures)] for i in range(PAGES)]
+    print('{:<8} {:>16} {:>16}'.format(
+        'workers', 'summary pages/s', 'full DOM pages/s'))
+    for workers in WORKERS:
+        farm = ParseFarm(max_workers=workers)
+        summary = await throughput(farm, parse_summary, bodies)
+        full = await throughput(farm, full_parse, bodies[:PAGES // 4])
+        print('{:<8} {:>16.0f} {:>16.0f}'.format(workers, summary, full))
+        shutdown_pools()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
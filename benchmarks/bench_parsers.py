@@ -0,0 +1,68 @@
+"""
+Compare the HTML parser backends on the recorded summary.jsp fixtures.
+
+Backends whose package is not installed are skipped. The last lines are
+the bytes fast path that async_update tries before any backend, and the
+fingerprint that lets it skip parsing an unchanged page altogether.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_parsers.py
+"""
+import glob
+import os
+import timeit
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.parsers import (
+    PARSER_BACKENDS, fast_element_text, get_parser, summary_fingerprint)
+
+FIXTURES = os.path.join(
+    os.path.dirname(__file__), os.pardir, 'tests', 'fixtures')
+ROUNDS = 200
+
+
+def load_fixtures():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, 'summary_*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    pages = load_fixtures()
+    for name in PARSER_BACKENDS:
+        try:
+            parser = get_parser(name)
+        except ImportError:
+            print('{:<12} not installed'.format(name))
+            continue
+
+        def run():
+            for text in pages:
+                parser.element_text(text, AdtPulsedotcom.ALARM_STATE)
+
+        report(name, run, pages)
+
+    def run_fast():
+        for body in pages:
+            fast_element_text(body, AdtPulsedotcom.ALARM_STATE)
+
+    report('fast path', run_fast, pages)
+
+    def run_fingerprint():
+        for body in pages:
+            summary_fingerprint(body)
+
+    report('fingerprint', run_fingerprint, pages)
+
+
+def report(name, run, pages):
+    elapsed = min(timeit.repeat(run, number=ROUNDS, repeat=3))
+    print('{:<12} {:>8.1f} us/page'.format(
+        name, elapsed / (ROUNDS * len(pages)) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare plain polling with sync-check polling against the stub portal.
+
+Every account polls the same number of times while a few zones change
+along the way. Plain polling fetches summary.jsp on every poll; with
+sync_check the client asks the tiny sync-check endpoint first and fetches
+the page only when its token advanced. Reports requests, bytes served and
+the CPU time of the process, which also runs the stub.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_sync_check.py --accounts 200 --polls 20
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.stub_portal import StubPortal
+
+
+async def account(index, portal, polls, change_rate, sync_check, rng):
+    username = 'user{}'.format(index)
+    async with AdtPulsedotcom(username, 'pass',
+                              sync_check=sync_check) as client:
+        client.ADTPULSEDOTCOM_URL = portal.url
+        for poll in range(polls):
+            if rng.random() < change_rate:
+                portal.set_zone(username, 'Front Door',
+                                'Open' if poll % 2 else 'Closed')
+            await client.async_update()
+        return client.change_stats
+
+
+async def run(args, sync_check):
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = None
+    rng = random.Random(1)
+    async with StubPortal(latency=args.latency) as portal:
+        start = time.process_time()
+        stats = await asyncio.gather(*[
+            account(index, portal, args.polls, args.change_rate, sync_check,
+                    rng)
+            for index in range(args.accounts)])
+        cpu = time.process_time() - start
+    polls = args.accounts * args.polls
+    requests = sum(count for page, count in portal.stats.items()
+                   if page not in ('bytes', 'expired'))
+    print('{:<11} {:>9} {:>9} {:>12} {:>12} {:>10}'.format(
+        'sync check' if sync_check else 'plain', requests,
+        portal.stats['summary'], portal.stats['bytes'] // polls,
+        round(cpu / polls * 1e6), sum(s['hits'] for s in stats)))
+
+
+async def main(args):
+    print('{} accounts x {} polls, {:.0%} of polls after a change'.format(
+        args.accounts, args.polls, args.change_rate))
+    print('{:<11} {:>9} {:>9} {:>12} {:>12} {:>10}'.format(
+        'mode', 'requests', 'summaries', 'bytes/poll', 'cpu us/poll',
+        'unchanged'))
+    await run(args, False)
+    await run(args, True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--polls', type=int, default=20)
+    parser.add_argument('--change-rate', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=0.005)
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Throughput and latency of the HTTP transports against a local stub portal.
+
+The aiohttp and httpx transports fetch summary.jsp from a local aiohttp
+server, the replay transport serves it from memory. Transports whose
+package is not installed are skipped.
+
+Run from the repository root with:
+
+    PYTHONPATH=. python benchmarks/bench_transports.py
+"""
+import asyncio
+import os
+import statistics
+import time
+
+from aiohttp import web
+
+from pyadtpulsedotcom.transport import (
+    AiohttpTransport, HttpxTransport, ReplayTransport)
+
+REQUESTS = 1000
+CONCURRENCY = 50
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, 'tests',
+                       'fixtures', 'summary_disarmed.html')
+
+
+async def start_stub(body):
+    async def summary(request):
+        return web.Response(body=body, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/summary/summary.jsp', summary)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, 'http://127.0.0.1:{}/summary/summary.jsp'.format(port)
+
+
+async def measure(transport, url):
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def fetch():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await transport.request('GET', url)
+            await response.read()
+            await response.release()
+            latencies.append(time.perf_counter() - start)
+
+    await fetch()
+    latencies.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch() for _ in range(REQUESTS)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (REQUESTS / elapsed, statistics.median(latencies),
+            latencies[int(len(latencies) * 0.99)])
+
+
+def transports(body, url):
+    transport = ReplayTransport()
+    transport.add('GET', url, body=body)
+    yield 'replay', transport
+    yield 'aiohttp', AiohttpTransport.managed()
+    try:
+        yield 'httpx', HttpxTransport()
+    except ImportError:
+        print('{:<8} not installed'.format('httpx'))
+
+
+async def main():
+    with open(FIXTURE, 'rb') as f:
+        body = f.read()
+    runner, url = await start_stub(body)
+    print('{:<8} {:>10} {:>10} {:>10}'.format(
+        'transport', 'req/s', 'p50 ms', 'p99 ms'))
+    for name, transport in transports(body, url):
+        rate, p50, p99 = await measure(transport, url)
+        await transport.close()
+        print('{:<8} {:>10.0f} {:>10.2f} {:>10.2f}'.format(
+            name, rate, p50 * 1e3, p99 * 1e3))
+    await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+import asyncio
+import collections
+from collections import namedtuple
+
+# Changes between two polls of summary.jsp, old is None when first seen
+StateChange = namedtuple('StateChange', ['old', 'new'])
+MessageChange = namedtuple('MessageChange', ['old', 'new'])
+ZoneChange = namedtuple('ZoneChange', ['zone', 'name', 'old', 'new'])
+
+
+def diff_summary(old, new):
+    """
+    List what changed between two parsed summary pages.
+
+    :param old: Previous Summary, None when there was none
+    :param new: Current Summary
+    :return: List of StateChange, MessageChange and ZoneChange
+    """
+    changes = []
+    if old is None or old.state != new.state:
+        changes.append(StateChange(old and old.state, new.state))
+    if (old.message if old else None) != new.message:
+        changes.append(MessageChange(old and old.message, new.message))
+
+    old_zones = {zone.zone: zone for zone in old.zones} if old else {}
+    new_zones = {zone.zone: zone for zone in new.zones}
+    for key, zone in new_zones.items():
+        previous = old_zones.get(key)
+        if previous is None or previous.status != zone.status:
+            changes.append(ZoneChange(key, zone.name,
+                                      previous and previous.status,
+                                      zone.status))
+    for key, zone in old_zones.items():
+        if key not in new_zones:
+            changes.append(ZoneChange(key, zone.name, zone.status, None))
+    return changes
+
+
+def coalesce(changes):
+    """
+    Merge changes to the same thing into one, from the first old value to
+    the last new value, and drop the ones that ended where they started.
+    """
+    merged = {}
+    for change in changes:
+        key = (type(change), getattr(change, 'zone', None))
+        first = merged.get(key)
+        merged[key] = change if first is None else change._replace(
+            old=first.old)
+    return [change for change in merged.values() if change.old != change.new]
+
+
+class ChangeQueue(object):
+    """
+    Bounded queue of change batches, one batch per poll.
+
+    A put never waits: when the queue is full the new changes are merged
+    into the last batch, so a slow reader never makes it grow without
+    bound. The poll scheduler waits for room before polling instead.
+    """
+
+    def __init__(self, maxsize=8):
+        """
+        :param maxsize: Batches held before new ones are merged
+        """
+        self.maxsize = maxsize
+        self._batches = collections.deque()
+        self._readable = asyncio.Event()
+
+    def __len__(self):
+        return len(self._batches)
+
+    def full(self):
+        return len(self._batches) >= self.maxsize
+
+    def put(self, changes):
+        """Queue the changes of one poll."""
+        if self.full():
+            changes = coalesce(self._batches.pop() + changes)
+            if not changes:
+                if not self._batches:
+                    self._readable.clear()
+                return
+        self._batches.append(list(changes))
+        self._readable.set()
+
+    async def get(self):
+        """Wait for the next batch of changes."""
+        while not self._batches:
+            await self._readable.wait()
+        batch = self._batches.popleft()
+        if not self._batches:
+            self._readable.clear()
+        return batch
@@ -0,0 +1,77 @@
+import ssl
+import logging
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+# Connector tuning for many clients talking to the one portal host
+LIMIT = 100
+LIMIT_PER_HOST = 50
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+_connector = None
+_users = 0
+
+
+def tuned_connector(ssl_context=None, limit=LIMIT,
+                    limit_per_host=LIMIT_PER_HOST, ttl_dns_cache=DNS_CACHE_TTL,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT):
+    """
+    Build a TCPConnector tuned for polling AdtPulse.com.
+
+    Connections are kept alive between polls, so most polls skip the TCP and
+    TLS handshakes, and DNS lookups are cached. A single SSL context is used
+    for every connection, so the trust store is loaded only once.
+
+    :param ssl_context: SSLContext, defaults to the system trust store
+    :param limit: Maximum connections in total
+    :param limit_per_host: Maximum connections to the portal
+    :param ttl_dns_cache: Seconds to cache DNS lookups
+    :param keepalive_timeout: Seconds to keep an idle connection open
+    """
+    return aiohttp.TCPConnector(
+        ssl=ssl_context or ssl.create_default_context(),
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=ttl_dns_cache,
+        keepalive_timeout=keepalive_timeout)
+
+
+def acquire_connector():
+    """
+    Get the connector shared by every managed client in the process.
+
+    Must be called from the event loop. Every call needs a matching
+    release_connector().
+    """
+    global _connector, _users
+    if _connector is None or _connector.closed:
+        _LOGGER.debug('Creating shared connection pool')
+        _connector = tuned_connector()
+    _users += 1
+    return _connector
+
+
+async def release_connector():
+    """Release the shared connector, closing it after the last user."""
+    global _connector, _users
+    _users = max(_users - 1, 0)
+    if _users == 0 and _connector is not None:
+        _LOGGER.debug('Closing shared connection pool')
+        await _connector.close()
+        _connector = None
+
+
+def managed_session():
+    """
+    Create a websession on the shared connection pool.
+
+    Every client gets its own session, and so its own cookie jar, while the
+    connections underneath are shared. Call release_connector() after
+    closing the session.
+    """
+    return aiohttp.ClientSession(
+        connector=acquire_connector(), connector_owner=False)
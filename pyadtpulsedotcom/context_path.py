@@ -0,0 +1,73 @@
+import os
+import re
+import json
+import time
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# How long a cached contextPath is used before it is revalidated, in seconds
+CONTEXT_PATH_TTL = 24 * 60 * 60
+
+# Versioned contextPath, e.g. /myhome/13.0.0-153
+CONTEXT_PATH_RE = re.compile(r'/myhome/\d[^/"\'\s;?#]*')
+CONTEXT_PATH_BYTES_RE = re.compile(CONTEXT_PATH_RE.pattern.encode())
+
+
+def extract_context_path(value):
+    """
+    Find the versioned contextPath in a URL, Location header or page body.
+
+    :param value: str or bytes to search
+    :return: The contextPath or None when it is not present
+    """
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        match = CONTEXT_PATH_BYTES_RE.search(value)
+        return match.group(0).decode('ascii') if match else None
+    match = CONTEXT_PATH_RE.search(value)
+    return match.group(0) if match else None
+
+
+def load_context_path(cache_file, ttl=CONTEXT_PATH_TTL):
+    """
+    Read a cached contextPath.
+
+    :param cache_file: Path of the cache file
+    :param ttl: Age in seconds after which the cached value is stale
+    :return: Tuple of (context_path, fresh) or None when nothing usable is cached
+    """
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            entry = json.load(f)
+        context_path = entry['context_path']
+        updated = float(entry['updated'])
+    except (OSError, ValueError, KeyError, TypeError):
+        _LOGGER.debug('No usable contextPath cache at %s', cache_file)
+        return None
+
+    fresh = time.time() - updated < ttl
+    _LOGGER.debug('Cached ADT Pulse ContextPath = %s (fresh: %s)',
+                  context_path, fresh)
+    return context_path, fresh
+
+
+def save_context_path(cache_file, context_path):
+    """
+    Write the contextPath to the cache file.
+
+    The file is replaced atomically so concurrently starting workers never
+    read a partial entry.
+
+    :param cache_file: Path of the cache file
+    :param context_path: Discovered contextPath
+    """
+    tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'context_path': context_path,
+                       'updated': time.time()}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        _LOGGER.warning('Unable to write contextPath cache to %s', cache_file)
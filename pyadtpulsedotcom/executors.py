@@ -0,0 +1,134 @@
+import os
+import asyncio
+import logging
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .parsers import parse_summary
+
+_LOGGER = logging.getLogger(__name__)
+
+# Where parse functions run
+INLINE = 'inline'
+THREAD = 'thread'
+PROCESS = 'process'
+
+_POOL_TYPES = {THREAD: ThreadPoolExecutor, PROCESS: ProcessPoolExecutor}
+_pools = {}
+
+
+def _shared_pool(mode, max_workers):
+    """Get the pool for a mode and size, shared by every executor using it."""
+    key = (mode, max_workers)
+    if key not in _pools:
+        _LOGGER.debug('Starting %s parse pool with %s workers',
+                      mode, max_workers)
+        _pools[key] = _POOL_TYPES[mode](max_workers=max_workers)
+    return _pools[key]
+
+
+class ParseExecutor(object):
+    """
+    Run HTML parsing inline, in a thread pool or in a process pool.
+
+    Pools are shared between executors of the same mode and size, so any
+    number of clients can use them. Functions run in a process pool must be
+    importable module-level functions with picklable arguments.
+    """
+
+    # Parser backend name for the pages it parses, None to leave it to the
+    # client
+    parser = None
+
+    def __init__(self, mode=INLINE, max_workers=None, max_pending=None):
+        """
+        :param mode: INLINE, THREAD or PROCESS
+        :param max_workers: Pool size, defaults to the number of CPUs
+        :param max_pending: Parses allowed in flight at once, defaults to max_workers
+        """
+        if mode != INLINE and mode not in _POOL_TYPES:
+            raise ValueError('Unknown parse executor mode {}'.format(mode))
+        self.mode = mode
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._max_pending = max_pending or self._max_workers
+        # An asyncio.Semaphore is bound to the loop it is first used on, so
+        # an executor shared across loops keeps one per loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) according to the executor mode.
+
+        :return: The result of func
+        """
+        if self.mode == INLINE:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self._max_pending)
+        async with semaphore:
+            return await loop.run_in_executor(
+                _shared_pool(self.mode, self._max_workers), func, *args)
+
+
+_default_executor = ParseExecutor()
+
+
+def get_executor(executor=None):
+    """
+    Get the executor to parse with.
+
+    :param executor: ParseExecutor, None for the process-wide default
+    """
+    return executor or _default_executor
+
+
+def set_default_executor(executor):
+    """
+    Set the executor used by clients that do not bring their own.
+
+    :param executor: ParseExecutor
+    """
+    global _default_executor
+    _default_executor = executor
+
+
+def shutdown_pools(wait=True):
+    """Shut down every shared parse pool."""
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(wait=wait)
+
+
+class ParseFarm(ParseExecutor):
+    """
+    Process pool that parses summary pages for every client in the process.
+
+    Clients hand over the raw response bytes and get a compact Summary back,
+    so only small results cross the process boundary. Use it for a single
+    client with the parse_executor argument, or for all of them with
+    set_default_executor().
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, parser=None):
+        """
+        :param max_workers: Worker processes, defaults to the number of CPUs
+        :param max_pending: Pages allowed in flight at once, defaults to 4 per worker
+        :param parser: Backend name for pages the fast path cannot handle,
+            also used by clients parsing in the farm without a parser of
+            their own
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        super().__init__(PROCESS, max_workers, max_pending or 4 * max_workers)
+        self.parser = parser
+
+    async def parse_summary(self, body):
+        """
+        Parse a summary.jsp response in the pool.
+
+        :param body: Raw response body
+        :return: Summary of state, message and zones
+        """
+        return await self.run(parse_summary, body, self.parser)
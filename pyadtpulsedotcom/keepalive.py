@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+from .scheduler import ClientScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class KeepaliveScheduler(ClientScheduler):
+    """
+    Keep the portal sessions of many clients alive from a single task.
+
+    Each client is pinged shortly before its session would idle out, based on
+    its last activity and the idle timeout it has learned. Clients register
+    themselves after logging in when they are given a scheduler.
+    """
+
+    def __init__(self, margin=30):
+        """
+        :param margin: Seconds before the idle timeout to refresh a session
+        """
+        super().__init__()
+        self.margin = margin
+
+    def due(self, client):
+        """Loop time at which the session of a client should be refreshed."""
+        return client.last_activity + client.session_timeout - self.margin
+
+    def add(self, client):
+        """
+        Start keeping the session of a client alive.
+
+        :param client: Logged in AdtPulsedotcom
+        """
+        if client in self._clients:
+            return
+        self._clients.add(client)
+        self._schedule_at(client, self.due(client))
+
+    def _ready(self, client, now):
+        due = self.due(client)
+        if due > now:
+            # Active since it was queued, check back later.
+            self._schedule_at(client, due)
+            return False
+        return True
+
+    async def _job(self, client):
+        try:
+            await client.async_keepalive()
+        except Exception:
+            _LOGGER.exception('Refreshing AdtPulse.com session failed')
+        if client in self._clients:
+            # A failed refresh is not retried before margin passed.
+            self._schedule_at(client, max(
+                self.due(client),
+                asyncio.get_running_loop().time() + self.margin))
@@ -0,0 +1,315 @@
+import re
+import html
+import hashlib
+import logging
+from collections import namedtuple
+
+from bs4 import BeautifulSoup
+
+_LOGGER = logging.getLogger(__name__)
+
+# Elements of summary.jsp
+ALARM_STATE = 'divOrbTextSummary'
+MESSAGE_CONTROL = 'warnMsgContents'
+ZONES_TABLE = 'orbSensorsList'
+
+# Compact results of parsing summary.jsp, cheap to send between processes
+Zone = namedtuple('Zone', ['name', 'zone', 'status'])
+Summary = namedtuple('Summary', ['state', 'message', 'zones'])
+
+
+class HtmlParserBackend(object):
+    """
+    Parse portal pages with BeautifulSoup and the stdlib html.parser.
+
+    Always available, but the slowest of the backends.
+    """
+
+    name = 'html.parser'
+
+    def element_text(self, text, element_id):
+        """
+        Get the text of the element with the given id.
+
+        :param text: HTML of the page, str or bytes
+        :param element_id: id attribute of the element
+        :return: Text of the element or None when it is not on the page
+        """
+        element = BeautifulSoup(text, 'html.parser').find(id=element_id)
+        return element.get_text() if element is not None else None
+
+    def table_rows(self, text, element_id):
+        """
+        Get the cell texts of every row of the table with the given id.
+
+        :param text: HTML of the page, str or bytes
+        :param element_id: id attribute of the table
+        :return: List of rows, each a list of cell texts, or None when missing
+        """
+        element = BeautifulSoup(text, 'html.parser').find(id=element_id)
+        if element is None:
+            return None
+        return [[cell.get_text() for cell in row.find_all('td')]
+                for row in element.find_all('tr')]
+
+
+class LxmlBackend(object):
+    """Parse portal pages with lxml.html, requires the lxml package."""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        self._fromstring = lxml.html.fromstring
+
+    def element_text(self, text, element_id):
+        """Get the text of the element with the given id."""
+        element = self._fromstring(text).get_element_by_id(element_id, None)
+        return element.text_content() if element is not None else None
+
+    def table_rows(self, text, element_id):
+        """Get the cell texts of every row of the table with the given id."""
+        element = self._fromstring(text).get_element_by_id(element_id, None)
+        if element is None:
+            return None
+        return [[cell.text_content() for cell in row.iter('td')]
+                for row in element.iter('tr')]
+
+
+class SelectolaxBackend(object):
+    """Parse portal pages with selectolax, requires the selectolax package."""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def element_text(self, text, element_id):
+        """Get the text of the element with the given id."""
+        element = self._parser(text).css_first('#{}'.format(element_id))
+        return element.text() if element is not None else None
+
+    def table_rows(self, text, element_id):
+        """Get the cell texts of every row of the table with the given id."""
+        element = self._parser(text).css_first('#{}'.format(element_id))
+        if element is None:
+            return None
+        return [[cell.text() for cell in row.css('td')]
+                for row in element.css('tr')]
+
+
+PARSER_BACKENDS = {
+    backend.name: backend
+    for backend in (HtmlParserBackend, LxmlBackend, SelectolaxBackend)}
+
+_default_parser = HtmlParserBackend.name
+_instances = {}
+
+
+def get_parser(name=None):
+    """
+    Get a parser backend by name.
+
+    :param name: Backend name, None for the process-wide default
+    :raises ImportError: When the package behind the backend is not installed
+    """
+    name = name or _default_parser
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    try:
+        backend = PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError('Unknown parser backend {}'.format(name))
+    _instances[name] = backend()
+    _LOGGER.debug('Using %s parser backend', name)
+    return _instances[name]
+
+
+def set_default_parser(name):
+    """
+    Set the parser backend used by clients that do not choose their own.
+
+    :param name: Backend name, one of PARSER_BACKENDS
+    """
+    global _default_parser
+    get_parser(name)
+    _default_parser = name
+
+
+# Markup stripped from an element by the fast path
+_MARKUP_RE = re.compile(rb'<!--.*?-->|<[^>]*>', re.S)
+_element_patterns = {}
+
+
+def _element_pattern(element_id):
+    """Compile, once per id, the pattern matching an element and its content."""
+    try:
+        return _element_patterns[element_id]
+    except KeyError:
+        pass
+    pattern = re.compile(
+        rb'<(\w+)[^>]*?\sid\s*=\s*["\']' + re.escape(element_id.encode()) +
+        rb'["\'][^>]*>(.*?)</\1\s*>', re.S | re.I)
+    _element_patterns[element_id] = pattern
+    return pattern
+
+
+def _fast_element_content(body, element_id):
+    """Get the raw content of an element that does not nest its own tag type."""
+    pattern = _element_pattern(element_id)
+    needle = element_id.encode()
+    pos = body.find(needle)
+    while pos != -1:
+        # Anchor the pattern on the tag holding the id instead of scanning.
+        match = pattern.match(body, body.rfind(b'<', 0, pos))
+        if match is not None:
+            break
+        pos = body.find(needle, pos + len(needle))
+    else:
+        return None
+
+    tag, content = match.groups()
+    if re.search(b'<' + tag + rb'[\s>/]', content, re.I):
+        return None
+    return content
+
+
+def _fast_text(content):
+    """Strip the markup from raw element content."""
+    return html.unescape(
+        _MARKUP_RE.sub(b'', content).decode('utf-8', 'replace'))
+
+
+def fast_element_text(body, element_id):
+    """
+    Get the text of an element straight from the response bytes.
+
+    Only handles elements that do not nest a tag of their own type, which
+    covers the orb summary and the warning message.
+
+    :param body: Raw response body
+    :param element_id: id attribute of the element
+    :return: Text of the element, or None when the fast path cannot tell
+    """
+    content = _fast_element_content(body, element_id)
+    return _fast_text(content) if content is not None else None
+
+
+_ROW_RE = re.compile(rb'<tr[\s>].*?</tr\s*>', re.S | re.I)
+_CELL_RE = re.compile(rb'<td(?:\s[^>]*)?>(.*?)</td\s*>', re.S | re.I)
+
+
+def fast_table_rows(body, element_id):
+    """
+    Get the cell texts of a table straight from the response bytes.
+
+    :param body: Raw response body
+    :param element_id: id attribute of the table
+    :return: List of rows, or None when the fast path cannot tell
+    """
+    content = _fast_element_content(body, element_id)
+    if content is None:
+        return None
+    return [[_fast_text(cell) for cell in _CELL_RE.findall(row)]
+            for row in _ROW_RE.findall(content)]
+
+
+
+def element_text(body, element_id, parser=None):
+    """
+    Get the text of an element, using the full parser only when needed.
+
+    :param body: Raw response body
+    :param element_id: id attribute of the element
+    :param parser: Backend name for the fallback, None for the default
+    :return: Text of the element or None when it is not on the page
+    """
+    if element_id.encode() not in body:
+        return None
+    text = fast_element_text(body, element_id)
+    if text is None:
+        _LOGGER.debug('Fast path missed %s, using the full parser', element_id)
+        text = get_parser(parser).element_text(body, element_id)
+    return text
+
+
+def table_rows(body, element_id, parser=None):
+    """
+    Get the cell texts of a table, using the full parser only when needed.
+
+    :param body: Raw response body
+    :param element_id: id attribute of the table
+    :param parser: Backend name for the fallback, None for the default
+    :return: List of rows, each a list of cell texts, or None when missing
+    """
+    if element_id.encode() not in body:
+        return None
+    rows = fast_table_rows(body, element_id)
+    if rows is None:
+        _LOGGER.debug('Fast path missed %s, using the full parser', element_id)
+        rows = get_parser(parser).table_rows(body, element_id)
+    return rows
+
+
+def parse_summary(body, parser=None):
+    """
+    Extract alarm state, warning message and zones from summary.jsp.
+
+    Takes the raw page and returns a small Summary, so it is cheap to run in
+    a process pool.
+
+    :param body: Raw response body
+    :param parser: Backend name for the fallback, None for the default
+    :return: Summary, with state None when the page is not a summary page
+    """
+    zones = []
+    for cells in table_rows(body, ZONES_TABLE, parser) or ():
+        if len(cells) >= 4:
+            zones.append(Zone(*(cell.strip() for cell in cells[1:4])))
+    return Summary(element_text(body, ALARM_STATE, parser),
+                   element_text(body, MESSAGE_CONTROL, parser),
+                   tuple(zones))
+
+
+_ID_ATTR_RE = re.compile(rb'\sid\s*=\s*["\']$', re.I)
+
+
+def _id_position(body, element_id):
+    """Find where the element with the given id attribute is on the page."""
+    needle = element_id.encode()
+    pos = body.find(needle)
+    while pos != -1:
+        if _ID_ATTR_RE.search(body[max(pos - 16, 0):pos]):
+            return pos
+        pos = body.find(needle, pos + len(needle))
+    return None
+
+
+def summary_fingerprint(body):
+    """
+    Hash the part of summary.jsp that parse_summary reads.
+
+    The rest of the page, e.g. the recent history, changes without the
+    alarm changing, so only the span from the first summary element to the
+    end of the zones table is hashed.
+
+    :param body: Raw response body
+    :return: Digest, or None when the page has no alarm state
+    """
+    found = {}
+    for element_id in (ALARM_STATE, MESSAGE_CONTROL, ZONES_TABLE):
+        pos = _id_position(body, element_id)
+        if pos is not None:
+            found[element_id] = pos
+    if ALARM_STATE not in found:
+        return None
+    start = max(body.rfind(b'<', 0, min(found.values())), 0)
+    end = len(body)
+    if max(found.values()) == found.get(ZONES_TABLE):
+        end = body.find(b'</table', found[ZONES_TABLE])
+        if end == -1:
+            end = len(body)
+    return hashlib.sha256(body[start:end]).digest()
@@ -0,0 +1,165 @@
+import re
+import asyncio
+import logging
+
+from .scheduler import ClientScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PollScheduler(ClientScheduler):
+    """
+    Poll the portal for many watched clients from a single task.
+
+    Clients register themselves while anybody watches them. A client whose
+    slowest watcher has no room for another batch of changes is held back
+    until that watcher catches up, which delays only that client.
+    """
+
+    def __init__(self, interval=30):
+        """
+        :param interval: Seconds between polls of a client
+        """
+        super().__init__()
+        self.interval = interval
+        self._held = set()
+
+    def delay(self, client, now=None):
+        """
+        Seconds until the next poll of a client that was just polled.
+
+        :param client: AdtPulsedotcom
+        :param now: Current loop time, None to read the clock
+        """
+        return self.interval
+
+    def add(self, client):
+        """
+        Start polling a client, right away.
+
+        :param client: AdtPulsedotcom
+        """
+        if client in self._clients:
+            return
+        self._clients.add(client)
+        self._schedule(client, 0)
+
+    def remove(self, client):
+        """
+        Stop polling a client.
+
+        :param client: AdtPulsedotcom
+        """
+        super().remove(client)
+        self._held.discard(client)
+
+    def poll_soon(self, client, delay=0):
+        """
+        Bring the next poll of a client forward.
+
+        :param client: Polled AdtPulsedotcom
+        :param delay: Seconds from now to poll it at the latest
+        """
+        if client in self._clients and client not in self._held:
+            self._schedule(client, delay)
+
+    def resume(self, client):
+        """Poll a client that was held back, now its watchers have room."""
+        if client in self._held:
+            self._held.discard(client)
+            self._schedule(client, 0)
+
+    async def close(self):
+        self._held.clear()
+        await super().close()
+
+    def _schedule(self, client, delay):
+        self._schedule_at(client, asyncio.get_running_loop().time() + delay)
+
+    def _ready(self, client, now):
+        if client.watchers_ready():
+            return True
+        _LOGGER.debug('Holding back polls for a slow watcher')
+        self._held.add(client)
+        return False
+
+    async def _job(self, client):
+        try:
+            await client.async_update()
+        except Exception:
+            _LOGGER.exception('Polling AdtPulse.com failed')
+        if client in self._clients:
+            self._schedule(client, self.delay(client))
+
+
+class AdaptivePollScheduler(PollScheduler):
+    """
+    Poll slowly while the alarm is stable and quickly while it changes.
+
+    A client is polled every min_interval while its orb shows a transition,
+    such as an exit delay, and for a while after a command was sent. Each
+    poll after that which finds nothing new multiplies the interval by the
+    backoff factor, up to max_interval. A poll that finds a change starts
+    over at min_interval.
+    """
+
+    # Orb texts of a panel on its way to another state
+    TRANSITION_RE = re.compile(
+        r'\b(?:dis)?arming\b|\bdelay\b|updating|please wait', re.I)
+
+    def __init__(self, min_interval=5, max_interval=60, backoff=2,
+                 command_period=60):
+        """
+        :param min_interval: Seconds between polls while the alarm changes
+        :param max_interval: Seconds between polls while it is stable
+        :param backoff: Factor the interval grows by after a quiet poll
+        :param command_period: Seconds after a command to keep polling fast
+        """
+        super().__init__(max_interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.command_period = command_period
+        self._intervals = {}
+        self._seen_changes = {}
+
+    def remove(self, client):
+        super().remove(client)
+        self._intervals.pop(client, None)
+        self._seen_changes.pop(client, None)
+
+    def transitioning(self, state):
+        """Check whether an orb text shows the alarm changing state."""
+        return state is not None and self.TRANSITION_RE.search(state) is not None
+
+    def delay(self, client, now=None):
+        if now is None:
+            now = asyncio.get_running_loop().time()
+        changed = client.last_change > self._seen_changes.get(client, 0)
+        self._seen_changes[client] = client.last_change
+        if (changed or self.transitioning(client.state) or
+                now - client.last_command < self.command_period):
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, self.backoff *
+                           self._intervals.get(client, self.min_interval))
+        self._intervals[client] = interval
+        return interval
+
+
+_default_scheduler = None
+
+
+def get_poll_scheduler(scheduler=None):
+    """
+    Resolve the scheduler to poll watched clients on.
+
+    :param scheduler: PollScheduler, None for the adaptive one shared by
+        the process
+    """
+    global _default_scheduler
+    if scheduler is not None:
+        return scheduler
+    if _default_scheduler is None:
+        _default_scheduler = AdaptivePollScheduler()
+    return _default_scheduler
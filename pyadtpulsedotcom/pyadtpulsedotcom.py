@@ -1,10 +1,23 @@
-import requests
 import re
+import time
 import logging
 import aiohttp
 import asyncio
-import async_timeout
-from bs4 import BeautifulSoup
+import functools
+import collections
+import weakref
+from yarl import URL
+
+from .parsers import (
+    element_text, get_parser, parse_summary, summary_fingerprint)
+from .changes import ChangeQueue, diff_summary
+from .executors import get_executor
+from .polling import get_poll_scheduler
+from .retry import RetryPolicy
+from .transport import AiohttpTransport
+from .context_path import (
+    CONTEXT_PATH_TTL, extract_context_path, load_context_path,
+    save_context_path)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,29 +35,43 @@ class AdtPulsedotcom(object):
     # AdtPulse.com baseURL
     ADTPULSEDOTCOM_URL = 'https://portal.adtpulse.com'
     
-    # AdtPulse.com contextPath
-    def adtpulse_version (ADTPULSEDOTCOM_URL):
-        """Determine current ADT Pulse version"""
-        resp = requests.get(ADTPULSEDOTCOM_URL)
-        parsed = BeautifulSoup(resp.content, 'html.parser')
-        adtpulse_script = parsed.find_all('script', type='text/javascript')[4].string
-        if "=" in adtpulse_script:
-            param, value = adtpulse_script.split("=",1)
-        adtpulse_version = value
-        adtpulse_version = adtpulse_version[1:-2]
-        _LOGGER.debug('ADT Pulse ContextPath = %s', adtpulse_version)
-        return(adtpulse_version)
-    
-    ADTPULSEDOTCOM_CONTEXT_PATH = adtpulse_version(ADTPULSEDOTCOM_URL)
-    
+    # AdtPulse.com contextPath, discovered on first login and shared by
+    # every instance in the process.
+    ADTPULSEDOTCOM_CONTEXT_PATH = None
+    # Locks serializing its discovery, one per event loop
+    _context_path_locks = weakref.WeakKeyDictionary()
+    MAX_CONTEXT_PATH_REDIRECTS = 3
+
+    # Seconds to wait for a single request to AdtPulse.com
+    TIMEOUT = 10
+
+    # Response validators, and the request headers that send them back
+    VALIDATOR_HEADERS = {'ETag': 'If-None-Match',
+                         'Last-Modified': 'If-Modified-Since'}
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+    # Seconds during which logins fail fast after a failed login
+    LOGIN_FAILURE_BACKOFF = 5
+
+    # Assumed session idle timeout until one is learned, and its lower bound
+    SESSION_TIMEOUT = 10 * 60
+    MIN_SESSION_TIMEOUT = 60
+
+    # Lightest page that keeps a session alive
+    KEEPALIVE_PATH = '/KeepAlive'
+
+    # Tiny endpoint whose token advances whenever the summary changes
+    SYNC_CHECK_PATH = '/Ajax/SyncCheckServ'
+    SYNC_TOKEN_RE = re.compile(r'^\d+-\d+-\d+$')
+
     # Page elements on portal.adtpulse.com that are needed
     # Using a dict for the attributes to set whether it is a name or id for locating the field
-    LOGIN_URL = ADTPULSEDOTCOM_URL + ADTPULSEDOTCOM_CONTEXT_PATH + '/access/signin.jsp'
+    LOGIN_PATH = '/access/signin.jsp'
     LOGIN_USERNAME = ('name', 'usernameForm')
     LOGIN_PASSWORD = ('name', 'passwordForm')
     LOGIN_BUTTON = ('name', 'signin')
     
-    DASHBOARD_URL = ADTPULSEDOTCOM_URL + ADTPULSEDOTCOM_CONTEXT_PATH + '/summary/summary.jsp'
+    DASHBOARD_PATH = '/summary/summary.jsp'
     
     STATUS_IMG = ('id', 'divOrb')
     
@@ -54,10 +81,6 @@ class AdtPulsedotcom(object):
     
     # Image to check if hidden or not while the system performs it's action.
     STATUS_UPDATING = {'id': 'divOrb'}    
-    # Session key regex to extract the current session
-    SESSION_KEY_RE = re.compile(
-        '{url}(?P<JSESSIONID>.*)'.format(url=LOGIN_URL))
-    
     # ADTPULSE.COM CSS MAPPINGS
     USERNAME = 'usernameForm'
     PASSWORD = 'passwordForm'
@@ -84,6 +107,7 @@ class AdtPulsedotcom(object):
     
     ARMING_PANEL = '#ctl00_phBody_pnlArming'
     ALARM_STATE = 'divOrbTextSummary'
+    ZONES_TABLE = 'orbSensorsList'
 
     COMMAND_LIST = {'Disarm': {'command': DISARM_COMMAND,
                            'eventvalidation': DISARM_EVENT_VALIDATION},
@@ -92,53 +116,530 @@ class AdtPulsedotcom(object):
                 'Arm+Away': {'command': ARM_AWAY_COMMAND,
                              'eventvalidation': ARM_AWAY_EVENT_VALIDATION}}
     
-    def __init__(self, username, password, websession, loop):
+    def __init__(self, username, password, websession=None,
+                 context_path_cache=None, context_path_ttl=CONTEXT_PATH_TTL,
+                 parser=None, parse_executor=None, retry_policy=None,
+                 session_store=None, keepalive=None, transport=None,
+                 sync_check=False, poll_scheduler=None):
         """
         Use aiohttp to make a request to alarm.com
 
         :param username: AdtPulse.com username
         :param password: AdtPulse.com password
-        :param websession: AIOHttp Websession
-        :param loop: Async loop.
+        :param websession: AIOHttp Websession, None to use a managed one on
+            the shared connection pool when used as an async context manager
+        :param context_path_cache: Optional file to persist the contextPath in
+        :param context_path_ttl: Seconds before a cached contextPath is revalidated
+        :param parser: HTML parser backend name, None for the one of the
+            parse executor or else the global default
+        :param parse_executor: ParseExecutor to parse pages in, None for the global default
+        :param retry_policy: RetryPolicy for updates and commands
+        :param session_store: Optional store to keep session cookies across restarts
+        :param keepalive: Optional KeepaliveScheduler to keep the session alive
+        :param transport: HTTP transport to use instead of websession, e.g.
+            HttpxTransport or ReplayTransport
+        :param sync_check: Whether updates ask the sync-check endpoint first
+            and only fetch the summary page when its token advanced
+        :param poll_scheduler: PollScheduler that polls while the client is
+            watched, None for the one shared by the process
         """
         self._username = username
         self._password = password
-        self._websession = websession
-        self._loop = loop
+        if transport is None and websession is not None:
+            transport = AiohttpTransport(websession)
+        self._transport = transport
+        self._owns_transport = False
+        self._revalidate_task = None
+        self._context_path_cache = context_path_cache
+        self._context_path_ttl = context_path_ttl
+        self._parser = parser
+        self._parse_executor = parse_executor
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._session_store = session_store
+        self._session_restored = False
+        self._keepalive = keepalive
+        # Longest idle period a session survived, shortest one it did not
+        self._longest_idle = 0
+        self._shortest_expiry = None
+        self.last_activity = 0
+        self.session_timeout = self.SESSION_TIMEOUT
         self._login_info = None
+        self._update_task = None
+        self._login_task = None
+        self._login_retry_at = 0
+        self._fingerprint = None
+        self._validators = {}
+        self._sync_check = sync_check
+        self._sync_token = None
+        self._poll_scheduler = poll_scheduler
+        self._watchers = set()
+        self._listeners = []
+        self._listener_tasks = set()
+        self._snapshot = None
+        self._changes = []
+        # Loop times of the last command sent and the last change found
+        self.last_command = 0
+        self.last_change = 0
+        # Polls answered without parsing, and polls that were parsed
+        self.change_stats = collections.Counter(hits=0, misses=0)
         self.state = None
+        self.message = None
+        self.zones = ()
 
-    @asyncio.coroutine
-    def async_login(self):
-        """Login to AdtPulse.com."""
-        _LOGGER.debug('Attempting to log into AdtPulse.com...')
+    async def __aenter__(self):
+        if self._transport is None:
+            self._transport = AiohttpTransport.managed()
+            self._owns_transport = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.async_close()
+
+    async def async_close(self):
+        """Stop polling and keepalive and close the transport if owned."""
+        self.poll_scheduler.remove(self)
+        if self._keepalive is not None:
+            self._keepalive.remove(self)
+        if self._owns_transport:
+            await self._transport.close()
+            self._transport = None
+            self._owns_transport = False
+
+    def _http(self):
+        """Get the transport to send requests with."""
+        if self._transport is None:
+            raise RuntimeError(
+                'AdtPulsedotcom needs a websession or transport, or has to '
+                'be used as "async with AdtPulsedotcom(...) as client"')
+        return self._transport
+
+    @property
+    def parser(self):
+        """HTML parser backend used for portal pages."""
+        return get_parser(self._parser or self.parse_executor.parser)
+
+    @property
+    def parse_executor(self):
+        """Executor that runs page parsing off the event loop."""
+        return get_executor(self._parse_executor)
+
+    @property
+    def poll_scheduler(self):
+        """Scheduler that polls the portal while the client is watched."""
+        return get_poll_scheduler(self._poll_scheduler)
+
+    async def _async_element_text(self, body, element_id):
+        """Get the text of an element of a portal page in the parse executor."""
+        return await self.parse_executor.run(
+            element_text, body, element_id, self.parser.name)
+
+    @property
+    def LOGIN_URL(self):
+        """Sign-in page for the current contextPath."""
+        return (self.ADTPULSEDOTCOM_URL + self.ADTPULSEDOTCOM_CONTEXT_PATH +
+                self.LOGIN_PATH)
+
+    @property
+    def DASHBOARD_URL(self):
+        """Summary page for the current contextPath."""
+        return (self.ADTPULSEDOTCOM_URL + self.ADTPULSEDOTCOM_CONTEXT_PATH +
+                self.DASHBOARD_PATH)
+
+    @property
+    def SESSION_KEY_RE(self):
+        """Session key regex to extract the current session."""
+        return re.compile(
+            '{url}(?P<JSESSIONID>.*)'.format(url=re.escape(self.LOGIN_URL)))
+
+    async def async_context_path(self, refresh=False):
+        """
+        Resolve the ADT Pulse contextPath once and share it between instances.
+
+        :param refresh: Rediscover the contextPath even if one is known
+        """
+        cls = AdtPulsedotcom
+        seen = cls.ADTPULSEDOTCOM_CONTEXT_PATH
+        if seen is not None and not refresh:
+            return seen
+        loop = asyncio.get_running_loop()
+        lock = cls._context_path_locks.get(loop)
+        if lock is None:
+            # An asyncio.Lock is bound to the loop it is first used on.
+            lock = cls._context_path_locks[loop] = asyncio.Lock()
+
+        async with lock:
+            # Another instance may have resolved it while we were waiting.
+            if cls.ADTPULSEDOTCOM_CONTEXT_PATH != seen:
+                return cls.ADTPULSEDOTCOM_CONTEXT_PATH
+
+            if seen is None and not refresh and self._context_path_cache:
+                cached = load_context_path(
+                    self._context_path_cache, self._context_path_ttl)
+                if cached is not None:
+                    cls.ADTPULSEDOTCOM_CONTEXT_PATH, fresh = cached
+                    if not fresh:
+                        self._revalidate_task = asyncio.ensure_future(
+                            self._async_revalidate_context_path())
+                    return cls.ADTPULSEDOTCOM_CONTEXT_PATH
+
+            self._set_context_path(
+                await self._async_discover_context_path())
+        return cls.ADTPULSEDOTCOM_CONTEXT_PATH
+
+    def _set_context_path(self, context_path):
+        """
+        Switch every instance to a new contextPath.
+
+        LOGIN_URL and DASHBOARD_URL are derived on access, so a single
+        assignment rebases all of them at once.
+        """
+        AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = context_path
+        if self._context_path_cache:
+            save_context_path(self._context_path_cache, context_path)
+
+    async def _async_discover_context_path(self):
+        """
+        Determine current ADT Pulse version from the portal redirects.
+
+        The landing page redirects to the versioned sign-in page, so the
+        contextPath is read from the Location header without downloading
+        the page. The body is only searched when no redirect carries it.
+        """
+        url = self.ADTPULSEDOTCOM_URL
+        for _ in range(self.MAX_CONTEXT_PATH_REDIRECTS):
+            response = None
+            try:
+                async with asyncio.timeout(self.TIMEOUT):
+                    response = await self._http().request(
+                        'GET', url, allow_redirects=False)
+                    location = response.headers.get('Location')
+                    context_path = (extract_context_path(location) or
+                                    extract_context_path(response.url.path))
+                    if context_path is None and location is None:
+                        context_path = extract_context_path(
+                            await response.read())
+            finally:
+                if response is not None:
+                    await response.release()
 
-        # Get the session key for future logins.
+            if context_path is not None:
+                _LOGGER.debug('ADT Pulse ContextPath = %s', context_path)
+                return context_path
+            if location is None:
+                break
+            url = response.url.join(URL(location))
+
+        raise ValueError('Unable to determine ADT Pulse contextPath')
+
+    async def _async_revalidate_context_path(self):
+        """Refresh a stale cached contextPath in the background."""
+        try:
+            await self.async_context_path(refresh=True)
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
+            _LOGGER.warning('Unable to revalidate ADT Pulse contextPath')
+
+    async def _async_rebase(self, response):
+        """
+        Follow the portal to a new contextPath when it has rolled a version.
+
+        A redirect whose target carries a different version is used directly.
+        A 404 or a redirect without a version triggers a rediscovery.
+
+        :param response: Response of a request against the current contextPath
+        :return: True when the URLs were rebased and the request should be retried
+        """
+        current = self.ADTPULSEDOTCOM_CONTEXT_PATH
+        if response.status == 404:
+            moved = None
+        else:
+            target = self._redirect_target(response)
+            if target is None:
+                return False
+            moved = extract_context_path(target)
+            if moved == current:
+                # Redirected within the same version, e.g. an expired session.
+                return False
+
+        if moved is not None:
+            _LOGGER.info('ADT Pulse contextPath moved from %s to %s',
+                         current, moved)
+            self._set_context_path(moved)
+        elif AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH == current:
+            _LOGGER.info('ADT Pulse contextPath %s is stale, rediscovering',
+                         current)
+            try:
+                await self.async_context_path(refresh=True)
+            except ValueError:
+                _LOGGER.error('Unable to determine contextPath of AdtPulse.com')
+                return False
+        return self.ADTPULSEDOTCOM_CONTEXT_PATH != current
+
+    def _redirect_target(self, response):
+        """
+        Get where the portal redirected a request to.
+
+        :return: The Location of an unfollowed redirect, the final URL of a
+            followed one, or None when the request was not redirected
+        """
+        if response.status in self.REDIRECT_STATUSES:
+            return response.headers.get('Location', '')
+        if response.history:
+            return str(response.url)
+        return None
+
+    def _session_expired(self, response):
+        """Check whether the portal sent a request to the sign-in page."""
+        target = self._redirect_target(response)
+        return target is not None and self.LOGIN_PATH in target
+
+    async def _async_request(self, method, path, data=None,
+                             allow_redirects=True, headers=None, rebase=True):
+        """
+        Request a portal page below the current contextPath.
+
+        The request is retried once against the new contextPath if the
+        portal has rolled a version since the URL was built.
+
+        :param method: HTTP method
+        :param path: Page path below the contextPath, e.g. LOGIN_PATH
+        :param data: Form fields to post
+        :param allow_redirects: Whether to follow redirects
+        :param headers: Extra request headers
+        :param rebase: Whether a 404 or a redirect to another version may
+            move the contextPath
+        """
+        for _ in range(2):
+            url = (self.ADTPULSEDOTCOM_URL + self.ADTPULSEDOTCOM_CONTEXT_PATH +
+                   path)
+            async with asyncio.timeout(self.TIMEOUT):
+                response = await self._http().request(
+                    method, url, data=data, allow_redirects=allow_redirects,
+                    headers=headers)
+            if not rebase or not await self._async_rebase(response):
+                break
+            await response.release()
+        return response
+
+    async def _async_single_flight(self, name, func):
+        """
+        Run func once for every caller that arrives while it is running.
+
+        :param name: Attribute holding the task in progress
+        :param func: Coroutine function to run
+        :return: The result of func
+        """
+        task = getattr(self, name)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            setattr(self, name, task)
+            task.add_done_callback(functools.partial(self._task_done, name))
+        else:
+            _LOGGER.debug('Joining %s in progress', func.__name__)
+        # Shielded so one cancelled caller does not cancel the others.
+        return await asyncio.shield(task)
+
+    def _task_done(self, name, task):
+        """Let the next caller start a new task."""
+        if getattr(self, name) is task:
+            setattr(self, name, None)
+
+    async def async_login(self):
+        """
+        Login to AdtPulse.com.
+
+        Concurrent callers share a single login. After a failed login, further
+        attempts fail at once for LOGIN_FAILURE_BACKOFF seconds.
+
+        :return: True when logged in
+        """
+        if (self._login_task is None and
+                asyncio.get_running_loop().time() < self._login_retry_at):
+            _LOGGER.debug('Last login to AdtPulse.com failed, not retrying yet')
+            return False
+        return await self._async_single_flight('_login_task', self._async_login)
+
+    async def _async_login(self):
+        """Make a single login attempt."""
+        if self._session_store is not None and not self._session_restored:
+            # Only the first login of the process can reuse a stored session.
+            self._session_restored = True
+            if await self._async_restore_session():
+                self._logged_in()
+                return True
+
+        if not await self._async_login_once():
+            self._login_retry_at = (asyncio.get_running_loop().time() +
+                                    self.LOGIN_FAILURE_BACKOFF)
+            return False
+        # Only a session the portal accepted is worth keeping.
+        if self._session_store is not None:
+            # File I/O, kept off the event loop.
+            await asyncio.to_thread(self._session_store.save, self._username,
+                                    self._portal_cookies())
+        self._logged_in()
+        return True
+
+    def _logged_in(self):
+        """Start tracking a new session."""
+        self.last_activity = asyncio.get_running_loop().time()
+        if self._keepalive is not None:
+            self._keepalive.add(self)
+
+    def _mark_active(self):
+        """
+        Record that the session was used successfully.
+
+        A session that survived a longer idle period than assumed shows the
+        idle timeout is longer.
+        """
+        now = asyncio.get_running_loop().time()
+        idle = now - self.last_activity
+        self._longest_idle = max(self._longest_idle, idle)
+        if self._shortest_expiry is not None and idle >= self._shortest_expiry:
+            # The portal lengthened its timeout.
+            self._shortest_expiry = None
+        self.session_timeout = max(self.session_timeout, idle)
+        self.last_activity = now
+
+    def _observe_expiry(self):
+        """
+        Learn the idle timeout from a session that expired.
+
+        The timeout lies between the longest idle period a session survived
+        and the shortest one it did not. The estimate moves to the middle of
+        the two, so the keepalive stops finding expired sessions after a
+        few pings instead of creeping down by its margin on every expiry.
+        """
+        if not self.last_activity:
+            return
+        idle = asyncio.get_running_loop().time() - self.last_activity
+        if idle <= self._longest_idle:
+            # The portal shortened its timeout.
+            self._longest_idle = 0
+        if self._shortest_expiry is None or idle < self._shortest_expiry:
+            self._shortest_expiry = idle
+        self.session_timeout = max(
+            self.MIN_SESSION_TIMEOUT,
+            (self._longest_idle + self._shortest_expiry) / 2)
+        _LOGGER.debug('Session expired after %.0fs idle, timeout now %.0fs',
+                      idle, self.session_timeout)
+
+    async def async_keepalive(self):
+        """
+        Refresh the session before it idles out, logging in again if it has.
+
+        :return: True when the session is alive
+        """
+        if not self._login_info:
+            return False
         response = None
         try:
-            with async_timeout.timeout(10, loop=self._loop):
-                response = yield from self._websession.get(
-                    self.LOGIN_URL)
+            # A missing keepalive page says nothing about the contextPath,
+            # the next summary request rebases it if it did move.
+            response = await self._async_request(
+                'POST', self.KEEPALIVE_PATH, allow_redirects=False,
+                rebase=False)
+            expired = self._session_expired(response)
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            _LOGGER.warning('Unable to refresh session on AdtPulse.com')
+            return False
+        finally:
+            if response is not None:
+                await response.release()
 
-            _LOGGER.debug(
-                'Response status from AdtPulse.com: %s',
-                response.status)
-            text = yield from response.text()
-            _LOGGER.debug(text)
-            tree = BeautifulSoup(text, 'html.parser')
-            self._login_info = {
-                'sessionkey': response.cookies['JSESSIONID'].value
-            }
+        if expired:
+            self._observe_expiry()
+            self._login_info = None
+            return await self.async_login()
+        if not 200 <= response.status < 300:
+            _LOGGER.warning('Unable to refresh session on AdtPulse.com, '
+                            'status %s', response.status)
+            return False
+        self._mark_active()
+        return True
+
+    def _portal_cookies(self):
+        """Get the cookies the transport holds for AdtPulse.com."""
+        return self._http().cookies(URL(self.ADTPULSEDOTCOM_URL).host)
+
+    async def _async_restore_session(self):
+        """
+        Reuse the session cookies kept in the session store.
+
+        The session is checked with one summary request that is not
+        followed to the sign-in page and whose body is not read.
+
+        :return: True when the stored session is still valid
+        """
+        cookies = await asyncio.to_thread(
+            self._session_store.load, self._username)
+        if cookies is None or 'JSESSIONID' not in cookies:
+            return False
 
-            _LOGGER.debug(self._login_info)
-            _LOGGER.info('Successfully retrieved sessionkey from AdtPulse.com')
+        _LOGGER.debug('Restoring stored session for AdtPulse.com')
+        response = None
+        try:
+            await self.async_context_path()
+            self._http().update_cookies(
+                cookies, URL(self.ADTPULSEDOTCOM_URL))
+            response = await self._async_request(
+                'GET', self.DASHBOARD_PATH, allow_redirects=False)
+            valid = (response.status == 200 and
+                     not self._session_expired(response))
+        except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
+            valid = False
+        finally:
+            if response is not None:
+                await response.release()
+
+        if not valid:
+            _LOGGER.debug('Stored session for AdtPulse.com is no longer valid')
+            await asyncio.to_thread(self._session_store.clear, self._username)
+            return False
+        self._login_info = {'sessionkey': cookies['JSESSIONID'].value}
+        _LOGGER.info('Reusing stored session for AdtPulse.com')
+        return True
+
+    def _session_cookie(self):
+        """Get the JSESSIONID the transport holds for AdtPulse.com."""
+        for morsel in self._portal_cookies():
+            if morsel.key == 'JSESSIONID':
+                return morsel.value
+        return None
+
+    async def _async_login_once(self):
+        """
+        Post the credentials, fetching a session key first if needed.
+
+        The sign-in page is only requested when the websession holds no
+        session cookie yet, and its body is never read.
+        """
+        _LOGGER.debug('Attempting to log into AdtPulse.com...')
+
+        response = None
+        try:
+            await self.async_context_path()
+            if self._session_cookie() is None:
+                # Get the session key for future logins.
+                response = await self._async_request('GET', self.LOGIN_PATH)
+                _LOGGER.debug(
+                    'Response status from AdtPulse.com: %s',
+                    response.status)
+                if self._session_cookie() is None:
+                    _LOGGER.error('Unable to get sessionKey from AdtPulse.com')
+                    return False
+                _LOGGER.info(
+                    'Successfully retrieved sessionkey from AdtPulse.com')
 
         except (asyncio.TimeoutError, aiohttp.ClientError):
             _LOGGER.error('Can not get login page from AdtPulse.com')
             return False
-        except AttributeError:
-            _LOGGER.error('Unable to get sessionKey from AdtPulse.com')
-            raise
+        except ValueError:
+            _LOGGER.error('Unable to determine contextPath of AdtPulse.com')
+            return False
+        finally:
+            if response is not None:
+                await response.release()
 
         # Login params to pass during the post
         params = {
@@ -146,109 +647,379 @@ class AdtPulsedotcom(object):
             self.PASSWORD: self._password
         }
         
+        response = None
         try:
             # Make an attempt to log in.
-            with async_timeout.timeout(10, loop=self._loop):
-                response = yield from self._websession.post(
-                    self.LOGIN_URL.format, data=params)
+            # The summary page it redirects to is not needed.
+            response = await self._async_request(
+                'POST', self.LOGIN_PATH, data=params, allow_redirects=False)
 
             _LOGGER.debug(
                 'Status from AdtPulse.com login %s', 
                 response.status)
-            _LOGGER.info('Successful login to AdtPulse.com')
+            accepted = self._login_accepted(response)
 
         except (asyncio.TimeoutError, aiohttp.ClientError):
             _LOGGER.error('Can not load login page from AdtPulse.com')
             return False
+        finally:
+            if response is not None:
+                await response.release()
+
+        if not accepted:
+            _LOGGER.error('AdtPulse.com rejected the login')
+            return False
+        _LOGGER.info('Successful login to AdtPulse.com')
+        self._login_info = {'sessionkey': self._session_cookie()}
+        _LOGGER.debug(self._login_info)
+        return True
+
+    def _login_accepted(self, response):
+        """
+        Check whether the portal accepted the posted credentials.
 
-    @asyncio.coroutine
-    def async_update(self):
-        """Fetch the latest state."""
+        A successful login redirects to the summary page, a rejected one
+        back to the sign-in page or shows the sign-in page again.
+        """
+        target = self._redirect_target(response)
+        if target is None or self.LOGIN_PATH in target:
+            return False
+        return self.DASHBOARD_PATH.rsplit('/', 1)[0] + '/' in URL(target).path
+
+    async def async_update(self):
+        """
+        Fetch the latest state.
+
+        Logs in again when the session expired, within the retry policy.
+        Concurrent callers share a single refresh and all get its outcome.
+
+        :return: RetryOutcome, which is False when no state could be fetched
+        """
         _LOGGER.debug('Calling update on AdtPulse.com')
+        return await self._async_single_flight(
+            '_update_task', self._async_update)
+
+    async def _async_update(self):
+        """Run a refresh within the retry policy."""
+        outcome = await self.retry_policy.run(self._async_update_once)
+        if not outcome:
+            _LOGGER.error('Can not load summary page from AdtPulse.com: %s',
+                          outcome)
+        self._publish()
+        return outcome
+
+    async def watch(self, max_pending=8):
+        """
+        Stream the changes of the alarm state, message and zones.
+
+        The client is polled on its poll scheduler while anybody watches it,
+        and every watcher sees the changes of those polls and of any other
+        update. The first changes describe the state as first seen. A
+        watcher that is max_pending polls behind holds back the polling
+        until it catches up.
+
+        Use as: async for change in client.watch()
+
+        :param max_pending: Polls of changes to hold for a slow watcher
+        :return: Async iterator of StateChange, MessageChange and ZoneChange
+        """
+        queue = ChangeQueue(max_pending)
+        if self._snapshot is not None:
+            queue.put(diff_summary(None, self._snapshot))
+        self._watchers.add(queue)
+        scheduler = self.poll_scheduler
+        scheduler.add(self)
+        try:
+            while True:
+                changes = await queue.get()
+                scheduler.resume(self)
+                for change in changes:
+                    yield change
+        finally:
+            self._watchers.discard(queue)
+            self._stop_polling_when_unobserved()
+
+    def watchers_ready(self):
+        """Check whether every watcher has room for the changes of a poll."""
+        return not any(queue.full() for queue in self._watchers)
+
+    def add_listener(self, callback, kinds=None):
+        """
+        Call a function with the changes found by every update.
+
+        The client is polled on its poll scheduler while it has listeners.
+        The callback gets one list per update holding all of its changes,
+        so it can apply them in a single pass. It is not called for updates
+        that found nothing new. A coroutine function is run as a task.
+
+        :param callback: Callable taking a list of changes
+        :param kinds: Change types to pass on, e.g. (StateChange,), None for all
+        :return: Function that removes the listener
+        """
+        listener = (callback, tuple(kinds) if kinds else None)
+        self._listeners.append(listener)
+        self.poll_scheduler.add(self)
+
+        def remove():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+                self._stop_polling_when_unobserved()
+        return remove
+
+    def _stop_polling_when_unobserved(self):
+        if not self._watchers and not self._listeners:
+            self.poll_scheduler.remove(self)
+
+    def _publish(self):
+        """Hand the changes found by the last update to watchers and listeners."""
+        changes, self._changes = self._changes, []
+        if not changes:
+            return
+        _LOGGER.debug('Changes on AdtPulse.com: %s', changes)
+        self.last_change = asyncio.get_running_loop().time()
+        for queue in self._watchers:
+            queue.put(changes)
+        for callback, kinds in list(self._listeners):
+            batch = changes if kinds is None else [
+                change for change in changes if isinstance(change, kinds)]
+            if batch:
+                self._notify(callback, batch)
+
+    def _notify(self, callback, changes):
+        """Call a listener, keeping its errors away from the update."""
+        try:
+            result = callback(changes)
+        except Exception:
+            _LOGGER.exception('Error in AdtPulse.com listener %s', callback)
+            return
+        if asyncio.iscoroutine(result):
+            task = asyncio.ensure_future(result)
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_done)
+
+    def _listener_done(self, task):
+        self._listener_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.error('Error in AdtPulse.com listener',
+                          exc_info=task.exception())
+
+    async def _async_update_once(self):
+        """
+        Make a single attempt at fetching the latest state.
+
+        :return: True when the state was read, False when it should be retried
+        """
+        if not self._login_info and not await self.async_login():
+            return False
+
+        token = None
+        if self._sync_check:
+            token = await self._async_sync_token()
+            if token is False:
+                return self._session_lost()
+            if token is not None and token == self._sync_token and \
+                    self.state is not None:
+                # Not marked active, the sync check does not keep sessions alive.
+                _LOGGER.debug('Sync token %s unchanged', token)
+                self.change_stats['hits'] += 1
+                return True
+
         response = None
-        if not self._login_info:
-            yield from self.async_login()
         try:
-            with async_timeout.timeout(10, loop=self._loop):
-                response = yield from self._websession.get(
-                    self.DASHBOARD_URL.format)
+            response = await self._async_request(
+                'GET', self.DASHBOARD_PATH, allow_redirects=False,
+                headers=self._conditional_headers())
 
             _LOGGER.debug('Response from AdtPulse.com: %s', response.status)
-            text = yield from response.text()
-            _LOGGER.debug(text)
-            tree = BeautifulSoup(text, 'html.parser')
-            try:
-                self.state = tree.select(self.ALARM_STATE)[0].get_text()
-                _LOGGER.debug(
-                    'Current alarm state: %s', self.state)
-            except IndexError:
-                # We may have timed out. Re-login again
-                self.state = None
-                self._login_info = None
-                yield from self.async_update()
-        except (asyncio.TimeoutError, aiohttp.ClientError):
-            _LOGGER.error("Can not load login page from AdtPulse.com")
+            if self._session_expired(response):
+                return self._session_lost()
+
+            if response.status == 304 and self.state is not None:
+                self._sync_token = token
+                return self._unchanged()
+
+            if response.status != 200:
+                # A server error, not a sign of an expired session.
+                _LOGGER.warning('Unable to load summary from AdtPulse.com, '
+                                'status %s', response.status)
+                return False
+
+            async with asyncio.timeout(self.TIMEOUT):
+                body = await response.read()
+            _LOGGER.debug(body)
+            fingerprint = summary_fingerprint(body)
+            self._validators = {
+                name: response.headers[header]
+                for header, name in self.VALIDATOR_HEADERS.items()
+                if header in response.headers}
+            if (fingerprint is not None and fingerprint == self._fingerprint
+                    and self.state is not None):
+                self._sync_token = token
+                return self._unchanged()
+
+            self.change_stats['misses'] += 1
+            summary = await self.parse_executor.run(
+                parse_summary, body, self.parser.name)
+        finally:
+            if response is not None:
+                await response.release()
+
+        self.state = summary.state
+        if self.state is None:
+            # A summary page without an orb, we may have timed out.
+            # Re-login again
+            self._fingerprint = None
+            self._login_info = None
             return False
+
+        self._fingerprint = fingerprint
+        self._sync_token = token
+        self._mark_active()
+        self.message = summary.message
+        self.zones = summary.zones
+        # Diffed against the last page read, as state is cleared on expiry.
+        self._changes = diff_summary(self._snapshot, summary)
+        self._snapshot = summary
+        _LOGGER.debug('Current alarm state: %s', self.state)
+        return True
+
+    async def _async_sync_token(self):
+        """
+        Ask the portal whether anything changed, without loading a page.
+
+        :return: The sync token, None when the portal did not give one, or
+            False when the session expired
+        """
+        response = None
+        try:
+            # A portal without the endpoint answers 404, which says nothing
+            # about the contextPath.
+            response = await self._async_request(
+                'GET', '{}?t={}'.format(self.SYNC_CHECK_PATH,
+                                        int(time.time() * 1000)),
+                allow_redirects=False, rebase=False)
+            if self._session_expired(response):
+                return False
+            if response.status == 404:
+                _LOGGER.warning('No sync check on AdtPulse.com, '
+                                'fetching the summary on every update')
+                self._sync_check = False
+                return None
+            async with asyncio.timeout(self.TIMEOUT):
+                token = (await response.read()).decode(
+                    'ascii', 'replace').strip()
         finally:
             if response is not None:
-                yield from response.release()
+                await response.release()
+
+        if response.status != 200 or not self.SYNC_TOKEN_RE.match(token):
+            _LOGGER.debug('Unexpected sync check response %s', response.status)
+            return None
+        return token
+
+    def _session_lost(self):
+        """Forget an expired session, to log in again without the sign-in page."""
+        _LOGGER.debug('Session on AdtPulse.com expired')
+        self._observe_expiry()
+        self.state = None
+        self._login_info = None
+        return False
+
+    def _conditional_headers(self):
+        """Headers that let the portal answer an unchanged page with a 304."""
+        if self.state is None or not self._validators:
+            return None
+        return self._validators
 
-    @asyncio.coroutine
-    def _send(self, event):
+    def _unchanged(self):
+        """Keep the current state of a poll that found nothing new."""
+        _LOGGER.debug('Summary page unchanged, skipping parsing')
+        self.change_stats['hits'] += 1
+        self._mark_active()
+        return True
+
+    async def _send(self, event):
         """Generic function for sending commands to AdtPulse.com
 
         :param event: Event command to send to alarm.com
+        :return: RetryOutcome, which is False when the command was not accepted
         """
         _LOGGER.debug('Sending %s to AdtPulse.com', event)
+        outcome = await self.retry_policy.run(
+            functools.partial(self._send_once, event))
+        if not outcome:
+            _LOGGER.error('Error while sending %s to AdtPulse.com: %s',
+                          event, outcome)
+        else:
+            _LOGGER.debug(outcome.result)
+            # Update adtpulse.com status after calling state change, without
+            # joining a refresh that started before the command.
+            if self._update_task is not None:
+                await asyncio.wait([self._update_task])
+            # Fetch the summary even if the sync token has not caught up yet.
+            self._sync_token = None
+            self.last_command = asyncio.get_running_loop().time()
+            await self.async_update()
+            # Follow the panel through its exit delay, if the client is polled.
+            scheduler = self.poll_scheduler
+            if self in scheduler:
+                scheduler.poll_soon(self, scheduler.delay(self))
+        return outcome
 
-        try:
-            with async_timeout.timeout(10, loop=self._loop):
-                response = yield from self._websession.post(
-                    self.DASHBOARD_URL.format(
-                        self._login_info['sessionkey']),
-                    data={
-                        self.EVENTVALIDATION:
-                            self.COMMAND_LIST[event]['eventvalidation'],
-                        self.COMMAND_LIST[event]['command']: event})
+    async def _send_once(self, event):
+        """
+        Make a single attempt at sending a command.
 
-                _LOGGER.debug(
-                    'Response from AdtPulse.com %s', response.status)
-                text = yield from response.text()
-                tree = BeautifulSoup(text, 'html.parser')
-                try:
-                    message = tree.select(
-                        '#{}'.format(self.MESSAGE_CONTROL))[0].get_text()
-                    if 'command' in message:
-                        _LOGGER.debug(message)
-                        # Update adtpulse.com status after calling state change.
-                        yield from self.async_update()
-                except IndexError:
-                    # May have been logged out
-                    yield from self.async_login()
-                    if event == 'Disarm':
-                        yield from self.async_alarm_disarm()
-                    elif event == 'Arm+Stay':
-                        yield from self.async_alarm_arm_away()
-                    elif event == 'Arm+Away':
-                        yield from self.async_alarm_arm_away()
+        :return: The portal message, '' when there was none, or None when the
+            command was not delivered and should be retried
+        """
+        if not self._login_info and not await self.async_login():
+            return None
 
-        except (asyncio.TimeoutError, aiohttp.ClientError):
-            _LOGGER.error('Error while trying to disarm AdtPulse.com system')
+        response = None
+        try:
+            response = await self._async_request(
+                'POST', self.DASHBOARD_PATH,
+                data={
+                    self.EVENTVALIDATION:
+                        self.COMMAND_LIST[event]['eventvalidation'],
+                    self.COMMAND_LIST[event]['command']: event},
+                allow_redirects=False)
+
+            _LOGGER.debug('Response from AdtPulse.com %s', response.status)
+            if self._session_expired(response):
+                # Not delivered, log in again and resend it.
+                self._observe_expiry()
+                self._login_info = None
+                return None
+            if response.status != 200:
+                _LOGGER.warning('AdtPulse.com did not take the command, '
+                                'status %s', response.status)
+                return None
+            # The portal took the command, from here on it is never resent.
+            self._mark_active()
+            try:
+                async with asyncio.timeout(self.TIMEOUT):
+                    body = await response.read()
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                _LOGGER.warning('Unable to read the command response')
+                return ''
         finally:
             if response is not None:
-                yield from response.release()
+                await response.release()
+
+        # Not every response carries a message.
+        return await self._async_element_text(
+            body, self.MESSAGE_CONTROL) or ''
 
-    @asyncio.coroutine
-    def async_alarm_disarm(self):
+    async def async_alarm_disarm(self):
         """Send disarm command."""
-        yield from self._send('Disarm')
+        return await self._send('Disarm')
 
-    @asyncio.coroutine
-    def async_alarm_arm_home(self):
+    async def async_alarm_arm_home(self):
         """Send arm hom command."""
-        yield from self._send('Arm+Stay')
+        return await self._send('Arm+Stay')
 
-    @asyncio.coroutine
-    def async_alarm_arm_away(self):
+    async def async_alarm_arm_away(self):
         """Send arm away command."""
-        yield from self._send('Arm+Away')
+        return await self._send('Arm+Away')
@@ -0,0 +1,113 @@
+import random
+import asyncio
+import logging
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+# Why a retry loop stopped
+SUCCESS = 'success'
+EXHAUSTED = 'exhausted'
+DEADLINE = 'deadline'
+
+
+class RetryOutcome(object):
+    """
+    Result of a retry loop.
+
+    Evaluates to True only when an attempt succeeded.
+    """
+
+    def __init__(self, reason, attempts, elapsed, result=None, error=None):
+        """
+        :param reason: SUCCESS, EXHAUSTED or DEADLINE
+        :param attempts: Number of attempts made
+        :param elapsed: Seconds spent, including backoff
+        :param result: Value returned by the successful attempt
+        :param error: Last exception raised by an attempt, if any
+        """
+        self.reason = reason
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.result = result
+        self.error = error
+
+    @property
+    def success(self):
+        return self.reason == SUCCESS
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        return '<RetryOutcome {} after {} attempts in {:.2f}s: {!r}>'.format(
+            self.reason, self.attempts, self.elapsed, self.error)
+
+
+class RetryPolicy(object):
+    """
+    Bounded retries with exponential backoff, full jitter and a deadline.
+
+    An attempt is an async callable that returns its result on success, and
+    None or False when it should be retried, e.g. after an expired session.
+    Network errors raised by an attempt are retried as well.
+    """
+
+    RETRY_EXCEPTIONS = (asyncio.TimeoutError, aiohttp.ClientError)
+
+    def __init__(self, max_attempts=3, base_delay=1, max_delay=30,
+                 deadline=60):
+        """
+        :param max_attempts: Attempts before giving up
+        :param base_delay: Backoff before the second attempt, in seconds
+        :param max_delay: Upper bound of a single backoff, in seconds
+        :param deadline: Seconds after which no attempt is started or continued
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt):
+        """Seconds to wait after the given failed attempt, counting from 1."""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def run(self, attempt):
+        """
+        Call attempt until it succeeds or the budget is spent.
+
+        :param attempt: Async callable without arguments
+        :return: RetryOutcome
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start + self.deadline
+        error = None
+        reason = EXHAUSTED
+
+        for attempts in range(1, self.max_attempts + 1):
+            try:
+                async with asyncio.timeout_at(end):
+                    result = await attempt()
+            except self.RETRY_EXCEPTIONS as err:
+                error = err
+                _LOGGER.debug('Attempt %s failed: %r', attempts, err)
+            else:
+                if result is not None and result is not False:
+                    return RetryOutcome(SUCCESS, attempts,
+                                        loop.time() - start, result, error)
+                _LOGGER.debug('Attempt %s did not succeed', attempts)
+
+            if attempts == self.max_attempts:
+                break
+            delay = self.backoff(attempts)
+            if loop.time() + delay >= end:
+                reason = DEADLINE
+                break
+            await asyncio.sleep(delay)
+
+        if loop.time() >= end:
+            reason = DEADLINE
+        return RetryOutcome(reason, attempts, loop.time() - start, None, error)
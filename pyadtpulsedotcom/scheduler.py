@@ -0,0 +1,95 @@
+import heapq
+import asyncio
+import itertools
+
+
+class ClientScheduler(object):
+    """
+    Run a job for many clients from a single timer task.
+
+    Clients wait in a heap keyed by the loop time they are due. Every due
+    job runs as a task of its own, so one slow client does not delay the
+    others, and schedules the next run of its client when it is done.
+    Subclasses implement _job and may hold a due client back in _ready.
+    """
+
+    def __init__(self):
+        self._clients = set()
+        self._due = {}
+        self._heap = []
+        self._jobs = set()
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, client):
+        return client in self._clients
+
+    def remove(self, client):
+        """
+        Stop scheduling a client.
+
+        :param client: AdtPulsedotcom
+        """
+        self._clients.discard(client)
+        self._due.pop(client, None)
+
+    async def close(self):
+        """Stop the scheduler task and forget every client."""
+        self._clients.clear()
+        self._due.clear()
+        self._heap.clear()
+        for job in self._jobs:
+            job.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _schedule_at(self, client, due):
+        """Run the job of a client at a loop time, unless it is due sooner."""
+        if self._due.get(client, due) < due:
+            return
+        self._due[client] = due
+        heapq.heappush(self._heap, (due, next(self._counter), client))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        self._wakeup.set()
+
+    def _ready(self, client, now):
+        """Check whether a due client runs now, or was put off."""
+        return True
+
+    async def _job(self, client):
+        raise NotImplementedError
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._heap:
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, client = heapq.heappop(self._heap)
+                if self._due.get(client) != due:
+                    # Removed or rescheduled since it was queued.
+                    continue
+                del self._due[client]
+                if self._ready(client, now):
+                    job = asyncio.ensure_future(self._job(client))
+                    self._jobs.add(job)
+                    job.add_done_callback(self._jobs.discard)
+
+            if not self._heap:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), self._heap[0][0] - now)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from email.utils import parsedate_to_datetime
+from http.cookies import SimpleCookie
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def cookie_expiry(morsel, now=None):
+    """
+    Get when a cookie expires.
+
+    :param morsel: http.cookies.Morsel
+    :return: Expiry as a unix timestamp, or None for a session cookie
+    """
+    now = time.time() if now is None else now
+    if morsel['max-age']:
+        try:
+            return now + int(morsel['max-age'])
+        except ValueError:
+            pass
+    if morsel['expires']:
+        try:
+            return parsedate_to_datetime(morsel['expires']).timestamp()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class FileSessionStore(object):
+    """
+    Keep the session cookies of each account in a file of its own.
+
+    Lets a restarted process reuse a portal session instead of logging in.
+    Every load and save touches only the file of one account, so a startup
+    with thousands of accounts stays linear and workers sharing the
+    directory do not overwrite each other's sessions. The methods do
+    blocking file I/O, the client runs them in a worker thread. Holds live
+    session cookies, so keep the directory private.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: Directory for the session files, created on the
+            first save
+        """
+        self._directory = directory
+
+    def _path(self, username):
+        """File of an account, named by a hash so any username is safe."""
+        name = hashlib.sha256(username.encode('utf-8')).hexdigest()
+        return os.path.join(self._directory, name + '.json')
+
+    def load(self, username):
+        """
+        Get the stored cookies of an account.
+
+        :param username: AdtPulse.com username
+        :return: SimpleCookie of the unexpired cookies, or None when there are none
+        """
+        try:
+            with open(self._path(username), encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        now = time.time()
+        cookies = SimpleCookie()
+        for entry in entries:
+            if entry.get('expires') is not None and entry['expires'] <= now:
+                continue
+            cookies[entry['name']] = entry['value']
+            cookies[entry['name']]['domain'] = entry.get('domain', '')
+            cookies[entry['name']]['path'] = entry.get('path', '/')
+        return cookies or None
+
+    def save(self, username, cookies):
+        """
+        Store the cookies of an account.
+
+        :param username: AdtPulse.com username
+        :param cookies: Iterable of http.cookies.Morsel
+        """
+        entries = [
+            {'name': morsel.key, 'value': morsel.value,
+             'domain': morsel['domain'], 'path': morsel['path'] or '/',
+             'expires': cookie_expiry(morsel)}
+            for morsel in cookies]
+        tmp_file = None
+        try:
+            os.makedirs(self._directory, mode=0o700, exist_ok=True)
+            # Created private, the cookies are as good as a password.
+            fd, tmp_file = tempfile.mkstemp(
+                suffix='.tmp', dir=self._directory)
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_file, self._path(username))
+        except OSError:
+            _LOGGER.warning('Unable to write session store %s',
+                            self._directory)
+            if tmp_file is not None and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def clear(self, username):
+        """
+        Forget the cookies of an account.
+
+        :param username: AdtPulse.com username
+        """
+        try:
+            os.remove(self._path(username))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            _LOGGER.warning('Unable to clear session store %s',
+                            self._directory)
@@ -0,0 +1,442 @@
+"""
+Local stand-in for the ADT Pulse portal, for load and end-to-end testing.
+
+Serves the landing redirect, signin.jsp, summary.jsp with the arm and disarm
+commands, the sync check and KeepAlive below a versioned contextPath, with
+idle session expiry, added latency and injected errors. Point a client at it with:
+
+    portal = StubPortal(latency=0.05)
+    await portal.start()
+    client = AdtPulsedotcom('user', 'pass', websession)
+    client.ADTPULSEDOTCOM_URL = portal.url
+
+Or run it on its own with: python -m pyadtpulsedotcom.stub_portal --help
+"""
+import uuid
+import hashlib
+import random
+import asyncio
+import logging
+import argparse
+import collections
+from html import escape
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+SESSION_COOKIE = 'JSESSIONID'
+LOGIN_PATH = '/access/signin.jsp'
+DASHBOARD_PATH = '/summary/summary.jsp'
+KEEPALIVE_PATH = '/KeepAlive'
+SYNC_CHECK_PATH = '/Ajax/SyncCheckServ'
+
+DISARMED = 'Disarmed.\xa0All Quiet.'
+# Alarm state after each command, and while its exit delay runs
+COMMANDS = {
+    'Disarm': (DISARMED, None),
+    'Arm Stay': ('Armed Stay.\xa0All Quiet.',
+                 'Arming Stay.\xa0Exit delay in progress.'),
+    'Arm Away': ('Armed Away.\xa0All Quiet.',
+                 'Arming Away.\xa0Exit delay in progress.'),
+}
+COMMAND_SENT = 'Your arm command was sent. Please wait.'
+COMMAND_FAILED = 'Unable to process the command.'
+
+ZONES = (('Front Door', 'Zone 1', 'Closed'),
+         ('Back Door', 'Zone 2', 'Closed'),
+         ('Garage Door', 'Zone 3', 'Closed'),
+         ('Living Room Motion', 'Zone 4', 'No Motion'),
+         ('Kitchen Window', 'Zone 5', 'Closed'),
+         ('Basement Smoke', 'Zone 6', 'Okay'))
+
+SIGNIN_PAGE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<title>ADT Pulse(TM) Interactive Solutions - Sign In</title>
+<script type="text/javascript">var sContextPath = "{context_path}";</script>
+</head>
+<body class="p_signinBody">
+<form id="signinForm" name="signinForm" method="post" action="{context_path}/access/signin.jsp">
+  <input type="text" id="usernameForm" name="usernameForm">
+  <input type="password" id="passwordForm" name="passwordForm">
+  <input type="submit" id="signin" name="signin" value="Sign In">
+</form>
+</body>
+</html>
+'''
+
+SUMMARY_PAGE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<title>ADT Pulse(TM) Interactive Solutions - Summary</title>
+<link rel="stylesheet" type="text/css" href="{context_path}/css/portal.css">
+<script type="text/javascript" src="{context_path}/js/summary.js"></script>
+<script type="text/javascript">var sContextPath = "{context_path}";</script>
+</head>
+<body class="p_body">
+<div id="divPage">
+<div id="divHeader" class="p_header">
+  <div id="divSiteName" class="p_whiteBoldText">{username}</div>
+  <ul id="divNav" class="p_nav">
+    <li class="p_navSelected"><a href="{context_path}/summary/summary.jsp">Summary</a></li>
+    <li><a href="{context_path}/system/system.jsp">System</a></li>
+    <li><a href="{context_path}/access/signout.jsp">Sign Out</a></li>
+  </ul>
+</div>
+<div id="divContent">
+<div id="divOrb" class="p_orb">
+  <div id="divOrbTextSummary" class="p_boldNormalTextLarge">{state}</div>
+  <div id="divOrbWarningsContainer"><div id="warnMsgContents" class="p_msgWarning">{message}</div></div>
+</div>
+<div id="divOrbSensors">
+<table id="orbSensorsList" class="p_listTable" cellpadding="0" cellspacing="0">
+  <tr class="p_listHeader"><th></th><th>Name</th><th>Zone</th><th>Status</th></tr>
+{zones}
+</table>
+</div>
+<div id="divHistory" class="p_module"><div class="p_moduleHeader">Recent History</div>
+<table class="p_listTable">
+{history}
+</table></div>
+</div>
+</div>
+</body>
+</html>
+'''
+
+ZONE_ROW = ('  <tr class="p_listRow"><td><img src="{context_path}/images/devices/'
+            'sensor.png" alt="sensor"></td><td><a class="p_grayNormalText" '
+            'href="#">{}</a></td><td>{}</td><td class="p_status">{}</td></tr>')
+HISTORY_ROW = '  <tr class="p_listRow"><td>{}</td><td>{}</td></tr>'
+
+
+class _Session(object):
+    """Portal session behind a JSESSIONID cookie."""
+
+    def __init__(self, now):
+        self.username = None
+        self.last_activity = now
+
+
+class _Account(object):
+    """Alarm system of one account."""
+
+    def __init__(self, zones):
+        self.state = DISARMED
+        self.armed_state = None
+        self.armed_at = None
+        self.zones = [list(zone) for zone in zones]
+        self.history = collections.deque(maxlen=12)
+        # Advanced on every change of the summary, served by the sync check
+        self.changes = 1
+
+    def current_state(self, now):
+        if self.armed_at is not None and now >= self.armed_at:
+            self.state = self.armed_state
+            self.armed_at = None
+            self.changes += 1
+        return self.state
+
+
+class StubPortal(object):
+    """
+    Fake ADT Pulse portal on a local aiohttp server.
+
+    Accounts are created on their first login. Request counts are kept in
+    stats, keyed by the page name and by outcome, e.g. 'summary', 'login',
+    'expired' and 'error'.
+    """
+
+    def __init__(self, version='13.0.0-153', accounts=None, latency=0,
+                 jitter=0, error_rate=0, session_timeout=600, exit_delay=0,
+                 zones=ZONES, etags=False, seed=None):
+        """
+        :param version: Portal version in the contextPath
+        :param accounts: Dict of username to password, None to accept any
+        :param latency: Seconds to wait before answering a request
+        :param jitter: Extra random latency of up to this many seconds
+        :param error_rate: Fraction of requests answered with a 503
+        :param session_timeout: Seconds of inactivity after which a session ends
+        :param exit_delay: Seconds an arm command stays in the arming state
+        :param zones: Zones as (name, zone, status) every account starts with
+        :param etags: Whether summary.jsp carries an ETag and answers
+            If-None-Match with a 304, which the real portal does not
+        :param seed: Seed of the random latency and errors
+        """
+        self.version = version
+        self.accounts = accounts
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.session_timeout = session_timeout
+        self.exit_delay = exit_delay
+        self.zones = zones
+        self.etags = etags
+        self.stats = collections.Counter()
+        self._random = random.Random(seed)
+        self._sessions = {}
+        self._alarms = {}
+        self._runner = None
+        self.url = None
+
+    @property
+    def context_path(self):
+        return '/myhome/' + self.version
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        Start serving.
+
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 for any free port
+        :return: Base URL of the portal
+        """
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port, backlog=1024)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        if host in ('127.0.0.1', '::1'):
+            # aiohttp cookie jars ignore cookies set by IP addresses.
+            host = 'localhost'
+        self.url = 'http://{}:{}'.format(host, port)
+        _LOGGER.debug('Stub portal listening on %s', self.url)
+        return self.url
+
+    async def close(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def expire_sessions(self):
+        """End every session, as if they all idled out."""
+        self._sessions.clear()
+
+    def state(self, username):
+        """Current alarm state of an account."""
+        return self._account(username).current_state(self._now())
+
+    def set_zone(self, username, name, status):
+        """
+        Change the status of a zone, e.g. when a door is opened.
+
+        :param username: Account of the zone
+        :param name: Zone name
+        :param status: New status, e.g. Open
+        """
+        account = self._account(username)
+        for zone in account.zones:
+            if zone[0] == name and zone[2] != status:
+                zone[2] = status
+                account.changes += 1
+
+    def _now(self):
+        return asyncio.get_running_loop().time()
+
+    def _account(self, username):
+        account = self._alarms.get(username)
+        if account is None:
+            account = self._alarms[username] = _Account(self.zones)
+        return account
+
+    def _session(self, request, touch=True):
+        """
+        Get the signed in session of a request, ending it when idle.
+
+        :param touch: Whether the request counts as activity
+        """
+        session_id = request.cookies.get(SESSION_COOKIE)
+        session = self._sessions.get(session_id)
+        if session is None or session.username is None:
+            return None
+        now = self._now()
+        if now - session.last_activity > self.session_timeout:
+            del self._sessions[session_id]
+            self.stats['expired'] += 1
+            return None
+        if touch:
+            session.last_activity = now
+        return session
+
+    def _new_session(self, response):
+        session_id = uuid.uuid4().hex.upper()
+        self._sessions[session_id] = session = _Session(self._now())
+        response.set_cookie(SESSION_COOKIE, session_id, path='/',
+                            httponly=True)
+        return session
+
+    def _redirect(self, page):
+        return web.Response(
+            status=302, headers={'Location': self.context_path + page})
+
+    async def _handle(self, request):
+        response = await self._dispatch(request)
+        self.stats['bytes'] += len(response.body or b'')
+        return response
+
+    async def _dispatch(self, request):
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats['error'] += 1
+            return web.Response(status=503, text='Service Unavailable')
+
+        path = request.path
+        if path == '/':
+            return self._redirect(LOGIN_PATH)
+        if not path.startswith(self.context_path + '/'):
+            if path.startswith('/myhome/'):
+                # Page of an old version, like after a portal roll.
+                self.stats['moved'] += 1
+                return self._redirect(LOGIN_PATH)
+            return web.Response(status=404)
+
+        page = path[len(self.context_path):]
+        if page == LOGIN_PATH:
+            return await self._signin(request)
+        if page == DASHBOARD_PATH:
+            return await self._summary(request)
+        if page == KEEPALIVE_PATH:
+            self.stats['keepalive'] += 1
+            if self._session(request) is None:
+                return self._redirect(LOGIN_PATH)
+            return web.Response(text='OK')
+        if page == SYNC_CHECK_PATH:
+            self.stats['sync_check'] += 1
+            # Polling the sync check does not keep a session alive.
+            session = self._session(request, touch=False)
+            if session is None:
+                return self._redirect(LOGIN_PATH)
+            account = self._account(session.username)
+            account.current_state(self._now())
+            return web.Response(text='{}-0-0'.format(account.changes))
+        return web.Response(status=404)
+
+    async def _signin(self, request):
+        if request.method != 'POST':
+            self.stats['signin'] += 1
+            response = web.Response(
+                text=SIGNIN_PAGE.format(context_path=self.context_path),
+                content_type='text/html')
+            self._new_session(response)
+            return response
+
+        self.stats['login'] += 1
+        form = await request.post()
+        username = form.get('usernameForm')
+        password = form.get('passwordForm')
+        if not username or (self.accounts is not None and
+                            self.accounts.get(username) != password):
+            self.stats['login_failed'] += 1
+            return self._redirect(LOGIN_PATH + '?e=ns')
+
+        response = self._redirect(DASHBOARD_PATH)
+        session = self._sessions.get(request.cookies.get(SESSION_COOKIE))
+        if session is None:
+            # Like the portal, a sign-in without a session starts one.
+            session = self._new_session(response)
+        session.username = username
+        session.last_activity = self._now()
+        return response
+
+    async def _summary(self, request):
+        session = self._session(request)
+        if session is None:
+            return self._redirect(LOGIN_PATH)
+        account = self._account(session.username)
+        message = ''
+        if request.method == 'POST':
+            self.stats['command'] += 1
+            form = await request.post()
+            message = COMMAND_FAILED
+            for command, (armed_state, arming_state) in COMMANDS.items():
+                if command in form:
+                    self._command(account, command, armed_state, arming_state)
+                    message = COMMAND_SENT
+                    break
+        else:
+            self.stats['summary'] += 1
+        page = self._render(session.username, account, message)
+        if not self.etags:
+            return web.Response(text=page, content_type='text/html')
+        etag = '"{}"'.format(
+            hashlib.blake2b(page.encode(), digest_size=8).hexdigest())
+        if request.headers.get('If-None-Match') == etag:
+            self.stats['not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(text=page, content_type='text/html',
+                            headers={'ETag': etag})
+
+    def _command(self, account, command, armed_state, arming_state):
+        now = self._now()
+        account.history.appendleft('{} by user'.format(command))
+        account.changes += 1
+        if arming_state is None or not self.exit_delay:
+            account.state = armed_state
+            account.armed_at = None
+        else:
+            account.state = arming_state
+            account.armed_state = armed_state
+            account.armed_at = now + self.exit_delay
+
+    def _render(self, username, account, message):
+        state = escape(account.current_state(self._now()))
+        state = state.replace('.\xa0', '.&nbsp;', 1)
+        zones = '\n'.join(
+            ZONE_ROW.format(*(escape(field) for field in zone),
+                            context_path=self.context_path)
+            for zone in account.zones)
+        history = '\n'.join(
+            HISTORY_ROW.format(index, escape(entry))
+            for index, entry in enumerate(account.history))
+        return SUMMARY_PAGE.format(
+            context_path=self.context_path, username=escape(username),
+            state=state, message=escape(message), zones=zones,
+            history=history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a stub ADT Pulse portal')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--version', default='13.0.0-153')
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--session-timeout', type=float, default=600)
+    parser.add_argument('--exit-delay', type=float, default=0)
+    args = parser.parse_args()
+
+    async def serve():
+        portal = StubPortal(
+            args.version, latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, session_timeout=args.session_timeout,
+            exit_delay=args.exit_delay)
+        print('Stub portal on {}'.format(await portal.start(args.host,
+                                                             args.port)))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await portal.close()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
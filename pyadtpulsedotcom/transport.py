@@ -0,0 +1,290 @@
+import os
+import json
+import asyncio
+import logging
+from http.cookies import Morsel, SimpleCookie
+
+import aiohttp
+from multidict import CIMultiDict
+from yarl import URL
+
+from .connection import managed_session, release_connector
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TransportError(aiohttp.ClientError):
+    """Network error raised by a non-aiohttp transport."""
+
+
+def _cookiejar_host(host):
+    """
+    Name http.cookiejar files the cookies of a host under.
+
+    Like cookiejar, a host without a dot such as localhost gets .local.
+    """
+    return host if '.' in host else host + '.local'
+
+
+def _host_matches(host, domain):
+    """Check whether a cookie domain applies to a host."""
+    domain = (domain or '').lstrip('.')
+    return not domain or host == domain or host.endswith('.' + domain)
+
+
+class TransportResponse(object):
+    """
+    Response of a transport whose body has already been read.
+
+    Offers the same subset of aiohttp.ClientResponse the client uses:
+    status, url, headers, history, read() and release().
+    """
+
+    def __init__(self, status, url, headers=None, body=b'', history=()):
+        """
+        :param status: HTTP status code
+        :param url: Final URL of the request, str or yarl.URL
+        :param headers: Response headers
+        :param body: Response body
+        :param history: Responses of followed redirects
+        """
+        self.status = status
+        self.url = URL(str(url))
+        self.headers = CIMultiDict(headers or {})
+        self.history = tuple(history)
+        self._body = body
+
+    async def read(self):
+        return self._body
+
+    async def release(self):
+        pass
+
+
+class AiohttpTransport(object):
+    """
+    Transport over an aiohttp ClientSession.
+
+    aiohttp responses already provide what the client needs, so they are
+    returned as is and the body is only downloaded when it is read.
+    """
+
+    def __init__(self, websession, managed=False):
+        """
+        :param websession: aiohttp.ClientSession
+        :param managed: Whether the session is on the shared connection pool
+            and should be closed with the transport
+        """
+        self._websession = websession
+        self._managed = managed
+
+    @classmethod
+    def managed(cls):
+        """Create a transport with its own session on the shared pool."""
+        return cls(managed_session(), managed=True)
+
+    @property
+    def websession(self):
+        return self._websession
+
+    async def request(self, method, url, data=None, allow_redirects=True,
+                      headers=None):
+        """
+        Send a request.
+
+        :param method: HTTP method
+        :param url: Absolute URL
+        :param data: Form fields to post
+        :param allow_redirects: Whether to follow redirects
+        :param headers: Extra request headers, e.g. If-None-Match
+        :return: Response with status, url, headers, history, read() and release()
+        """
+        return await self._websession.request(
+            method, url, data=data, headers=headers,
+            allow_redirects=allow_redirects)
+
+    def cookies(self, host):
+        """
+        Get the cookies held for a host.
+
+        :param host: Host name, e.g. portal.adtpulse.com
+        :return: List of http.cookies.Morsel
+        """
+        return [morsel for morsel in self._websession.cookie_jar
+                if _host_matches(host, morsel['domain'])]
+
+    def update_cookies(self, cookies, url):
+        """
+        Add cookies as if they were set by a response from url.
+
+        :param cookies: http.cookies.SimpleCookie
+        :param url: yarl.URL the cookies apply to
+        """
+        self._websession.cookie_jar.update_cookies(cookies, url)
+
+    async def close(self):
+        """Close the session if the transport owns it."""
+        if self._managed:
+            await self._websession.close()
+            self._managed = False
+            await release_connector()
+
+
+class HttpxTransport(object):
+    """Transport over an httpx.AsyncClient, requires the httpx package."""
+
+    def __init__(self, client=None):
+        """
+        :param client: httpx.AsyncClient, None to create and own one
+        """
+        import httpx
+        self._httpx = httpx
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient()
+
+    async def request(self, method, url, data=None, allow_redirects=True,
+                      headers=None):
+        """Send a request, see AiohttpTransport.request."""
+        try:
+            response = await self._client.request(
+                method, url, data=data, headers=headers,
+                follow_redirects=allow_redirects)
+        except self._httpx.HTTPError as err:
+            raise TransportError(str(err)) from err
+        return TransportResponse(
+            response.status_code, response.url, response.headers.multi_items(),
+            response.content, response.history)
+
+    def cookies(self, host):
+        """Get the cookies held for a host."""
+        cookies = []
+        for cookie in self._client.cookies.jar:
+            if not _host_matches(_cookiejar_host(host), cookie.domain):
+                continue
+            morsel = Morsel()
+            morsel.set(cookie.name, cookie.value, cookie.value)
+            morsel['domain'] = cookie.domain
+            morsel['path'] = cookie.path
+            cookies.append(morsel)
+        return cookies
+
+    def update_cookies(self, cookies, url):
+        """Add cookies as if they were set by a response from url."""
+        for morsel in cookies.values():
+            self._client.cookies.set(
+                morsel.key, morsel.value,
+                domain=morsel['domain'] or _cookiejar_host(url.host),
+                path=morsel['path'] or '/')
+
+    async def close(self):
+        """Close the client if the transport owns it."""
+        if self._owns_client:
+            await self._client.aclose()
+
+
+class ReplayTransport(object):
+    """
+    In-memory transport that serves canned responses.
+
+    Responses are registered per method and URL and served in order; the
+    last one keeps being served once the others are used up. Set-Cookie
+    headers of served responses go into an in-memory cookie jar.
+    """
+
+    def __init__(self, latency=0):
+        """
+        :param latency: Seconds to wait before answering a request
+        """
+        self.latency = latency
+        self.requests = []
+        self._routes = {}
+        self._cookies = SimpleCookie()
+
+    @classmethod
+    def load(cls, path, latency=0):
+        """
+        Create a transport that replays a recorded scenario.
+
+        The recording is a JSON file with a list of responses, each with
+        method, url, status, headers as name/value pairs and optionally body,
+        the name of a file next to the recording holding the response body.
+
+        :param path: Path of the recording
+        :param latency: Seconds to wait before answering a request
+        """
+        with open(path, encoding='utf-8') as f:
+            recording = json.load(f)
+        directory = os.path.dirname(path)
+        transport = cls(latency)
+        for entry in recording['responses']:
+            body = b''
+            if entry.get('body'):
+                with open(os.path.join(directory, entry['body']), 'rb') as f:
+                    body = f.read()
+            transport.add(entry['method'], entry['url'],
+                          entry.get('status', 200), body,
+                          [tuple(header) for header in entry.get('headers', ())])
+        return transport
+
+    def add(self, method, url, status=200, body=b'', headers=None):
+        """
+        Register a response.
+
+        :param method: HTTP method
+        :param url: Absolute URL without query
+        :param status: HTTP status code
+        :param body: Response body
+        :param headers: Response headers, e.g. Location or Set-Cookie
+        """
+        self._routes.setdefault((method.upper(), str(url)), []).append(
+            (status, body, headers or {}))
+
+    async def request(self, method, url, data=None, allow_redirects=True,
+                      headers=None):
+        """
+        Serve the next registered response, see AiohttpTransport.request.
+
+        Request headers are ignored, so conditional requests are never
+        answered with a 304.
+        """
+        self.requests.append((method.upper(), str(url), data))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        history = []
+        while True:
+            response = self._serve(method.upper(), str(url))
+            location = response.headers.get('Location')
+            if (not allow_redirects or location is None or
+                    response.status not in (301, 302, 303, 307, 308)):
+                break
+            history.append(response)
+            url = response.url.join(URL(location))
+            if response.status == 303:
+                method = 'GET'
+        response.history = tuple(history)
+        return response
+
+    def _serve(self, method, url):
+        responses = self._routes.get((method, url.split('?')[0]))
+        if not responses:
+            _LOGGER.debug('No replay response for %s %s', method, url)
+            return TransportResponse(404, url)
+        status, body, headers = (
+            responses.pop(0) if len(responses) > 1 else responses[0])
+        for name, value in CIMultiDict(headers).items():
+            if name.lower() == 'set-cookie':
+                self._cookies.load(value)
+        return TransportResponse(status, url, headers, body)
+
+    def cookies(self, host):
+        """Get the cookies held, the replay jar ignores domains."""
+        return list(self._cookies.values())
+
+    def update_cookies(self, cookies, url):
+        """Add cookies to the jar."""
+        for morsel in cookies.values():
+            self._cookies[morsel.key] = morsel.value
+
+    async def close(self):
+        pass
@@ -31,10 +31,16 @@ setup(
       'Programming Language :: Python :: 3',
     ],
     keywords='',
-    packages=find_packages(exclude=['docs', 'tests*']),
+    packages=find_packages(exclude=['docs', 'tests*', 'benchmarks*']),
+    python_requires='>=3.11',
     include_package_data=True,
     author='Jeroen Goddijn',
     install_requires=install_requires,
+    extras_require={
+        'lxml': ['lxml'],
+        'selectolax': ['selectolax'],
+        'httpx': ['httpx'],
+    },
     dependency_links=dependency_links,
     author_email='mariniertje@gmail.com'
 )
@@ -0,0 +1,11 @@
+import pytest
+
+from pyadtpulsedotcom import AdtPulsedotcom
+
+
+@pytest.fixture(autouse=True)
+def undiscovered_context_path():
+    """Start every test without a contextPath, as a new process would."""
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = None
+    yield
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = None
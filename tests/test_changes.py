@@ -0,0 +1,49 @@
+import asyncio
+
+from pyadtpulsedotcom.changes import (
+    ChangeQueue, MessageChange, StateChange, ZoneChange, coalesce,
+    diff_summary)
+from pyadtpulsedotcom.parsers import Summary, Zone
+
+DISARMED = Summary('Disarmed.', None, (Zone('Front Door', 'Zone 1', 'Closed'),
+                                       Zone('Back Door', 'Zone 2', 'Closed')))
+
+
+def test_first_summary_is_all_new():
+    assert diff_summary(None, DISARMED) == [
+        StateChange(None, 'Disarmed.'),
+        ZoneChange('Zone 1', 'Front Door', None, 'Closed'),
+        ZoneChange('Zone 2', 'Back Door', None, 'Closed')]
+
+
+def test_diff_summary():
+    assert diff_summary(DISARMED, DISARMED) == []
+    opened = Summary('Disarmed.', 'Front Door is open',
+                     (Zone('Front Door', 'Zone 1', 'Open'),))
+    assert diff_summary(DISARMED, opened) == [
+        MessageChange(None, 'Front Door is open'),
+        ZoneChange('Zone 1', 'Front Door', 'Closed', 'Open'),
+        ZoneChange('Zone 2', 'Back Door', 'Closed', None)]
+
+
+def test_coalesce():
+    assert coalesce([StateChange('Disarmed.', 'Arming.'),
+                     ZoneChange('Zone 1', 'Front Door', 'Closed', 'Open'),
+                     StateChange('Arming.', 'Armed.'),
+                     ZoneChange('Zone 1', 'Front Door', 'Open', 'Closed')]) \
+        == [StateChange('Disarmed.', 'Armed.')]
+
+
+def test_full_queue_merges_batches():
+    async def run():
+        queue = ChangeQueue(2)
+        queue.put([StateChange('a', 'b')])
+        queue.put([StateChange('b', 'c')])
+        assert queue.full()
+        queue.put([StateChange('c', 'd'), MessageChange(None, 'm')])
+        assert len(queue) == 2
+        return [await queue.get(), await queue.get()]
+
+    assert asyncio.run(run()) == [
+        [StateChange('a', 'b')],
+        [StateChange('b', 'd'), MessageChange(None, 'm')]]
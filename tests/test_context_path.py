@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.context_path import (
+    extract_context_path, load_context_path, save_context_path)
+from pyadtpulsedotcom.transport import ReplayTransport
+
+PORTAL = 'https://portal.adtpulse.com'
+OLD = '/myhome/13.0.0-153'
+NEW = '/myhome/14.0.0-7'
+
+
+def discover(transport):
+    client = AdtPulsedotcom('user', 'pass', transport=transport)
+    return asyncio.run(client._async_discover_context_path())
+
+
+def write_cache(path, context_path, age):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'context_path': context_path,
+                   'updated': time.time() - age}, f)
+
+
+def cache_client(cache_file, transport, ttl=60):
+    return AdtPulsedotcom('user', 'pass', transport=transport,
+                          context_path_cache=str(cache_file),
+                          context_path_ttl=ttl)
+
+
+def test_save_and_load(tmp_path):
+    cache_file = str(tmp_path / 'context_path.json')
+    save_context_path(cache_file, OLD)
+    assert load_context_path(cache_file) == (OLD, True)
+    # Written through a temporary file that is renamed into place.
+    assert [path.name for path in tmp_path.iterdir()] == ['context_path.json']
+
+
+def test_stale_entry_is_not_fresh(tmp_path):
+    cache_file = tmp_path / 'context_path.json'
+    write_cache(cache_file, OLD, age=120)
+    assert load_context_path(str(cache_file), ttl=60) == (OLD, False)
+    assert load_context_path(str(cache_file), ttl=300) == (OLD, True)
+
+
+def test_missing_and_corrupt_cache(tmp_path):
+    cache_file = tmp_path / 'context_path.json'
+    assert load_context_path(str(cache_file)) is None
+    for content in ('{"context_path": "/myh', '[]', '{"updated": 1}',
+                    '{"context_path": "/myhome/1", "updated": "soon"}'):
+        cache_file.write_text(content, encoding='utf-8')
+        assert load_context_path(str(cache_file)) is None
+
+
+def test_unwritable_cache_is_ignored(tmp_path):
+    save_context_path(str(tmp_path / 'missing' / 'context_path.json'), OLD)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_warm_start_makes_no_request(tmp_path):
+    cache_file = tmp_path / 'context_path.json'
+    write_cache(cache_file, OLD, age=0)
+    transport = ReplayTransport()
+    client = cache_client(cache_file, transport)
+
+    assert asyncio.run(client.async_context_path()) == OLD
+    assert client._revalidate_task is None
+    assert transport.requests == []
+
+
+def test_stale_entry_revalidated_in_background(tmp_path):
+    cache_file = tmp_path / 'context_path.json'
+    write_cache(cache_file, OLD, age=120)
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, 302,
+                  headers={'Location': NEW + '/access/signin.jsp'})
+    client = cache_client(cache_file, transport)
+
+    async def run():
+        # The stale value is used right away, discovery runs behind it.
+        context_path = await client.async_context_path()
+        assert transport.requests == []
+        await client._revalidate_task
+        return context_path
+
+    assert asyncio.run(run()) == OLD
+    assert AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH == NEW
+    assert [url for _, url, _ in transport.requests] == [PORTAL]
+    assert load_context_path(str(cache_file), ttl=60) == (NEW, True)
+
+
+def test_cold_start_discovers_and_saves(tmp_path):
+    cache_file = tmp_path / 'context_path.json'
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, 302,
+                  headers={'Location': NEW + '/access/signin.jsp'})
+    client = cache_client(cache_file, transport)
+
+    assert asyncio.run(client.async_context_path()) == NEW
+    assert load_context_path(str(cache_file)) == (NEW, True)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (OLD + '/access/signin.jsp', OLD),
+    (PORTAL + OLD + '/summary/summary.jsp?e=ns', OLD),
+    ('/myhome/13.0.0-153;jsessionid=ABC', OLD),
+    (b'<script src="/myhome/13.0.0-153/js/app.js">', OLD),
+    ('/myhome/access/signin.jsp', None),
+    (b'<html>no version</html>', None),
+    ('', None),
+    (None, None),
+])
+def test_extract_context_path(value, expected):
+    assert extract_context_path(value) == expected
+
+
+def test_discovery_reads_location_without_body():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, 302, body=b'/myhome/0.0.0-0',
+                  headers={'Location': OLD + '/access/signin.jsp'})
+    assert discover(transport) == OLD
+    assert len(transport.requests) == 1
+
+
+def test_discovery_falls_back_to_body():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, body=b'<form action="' +
+                  OLD.encode() + b'/access/signin.jsp">')
+    assert discover(transport) == OLD
+
+
+def test_discovery_follows_relative_redirects():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, 302, headers={'Location': '/myhome/'})
+    transport.add('GET', PORTAL + '/myhome/', 302,
+                  headers={'Location': 'access/'})
+    transport.add('GET', PORTAL + '/myhome/access/', 302,
+                  headers={'Location': NEW + '/access/signin.jsp'})
+    assert discover(transport) == NEW
+    assert [url for _, url, _ in transport.requests] == [
+        PORTAL, PORTAL + '/myhome/', PORTAL + '/myhome/access/']
+
+
+def test_discovery_gives_up_after_max_redirects():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, 302, headers={'Location': '/a'})
+    transport.add('GET', PORTAL + '/a', 302, headers={'Location': '/b'})
+    transport.add('GET', PORTAL + '/b', 302, headers={'Location': '/c'})
+    transport.add('GET', PORTAL + '/c', 302,
+                  headers={'Location': OLD + '/access/signin.jsp'})
+    with pytest.raises(ValueError):
+        discover(transport)
+    assert len(transport.requests) == AdtPulsedotcom.MAX_CONTEXT_PATH_REDIRECTS
+
+
+def test_discovery_fails_without_version():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, body=b'<html>Maintenance</html>')
+    with pytest.raises(ValueError):
+        discover(transport)
+    assert len(transport.requests) == 1
+
+
+def test_discovery_in_successive_event_loops():
+    transport = ReplayTransport(latency=0.01)
+    transport.add('GET', PORTAL, 302,
+                  headers={'Location': OLD + '/access/signin.jsp'})
+
+    async def resolve():
+        clients = [AdtPulsedotcom('user', 'pass', transport=transport)
+                   for _ in range(2)]
+        return await asyncio.gather(
+            *[client.async_context_path(refresh=True) for client in clients])
+
+    # Each asyncio.run has a loop of its own, the lock must follow it.
+    for _ in range(2):
+        assert asyncio.run(resolve()) == [OLD, OLD]
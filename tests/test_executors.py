@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+import pytest
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.executors import (
+    INLINE, PROCESS, THREAD, ParseExecutor, ParseFarm, shutdown_pools)
+from pyadtpulsedotcom.parsers import element_text
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def teardown_module():
+    shutdown_pools()
+
+
+@pytest.mark.parametrize('mode', [INLINE, THREAD, PROCESS])
+def test_modes_agree(mode):
+    with open(os.path.join(FIXTURES, 'summary_armed_stay.html'), 'rb') as f:
+        body = f.read()
+    executor = ParseExecutor(mode, max_workers=2)
+
+    async def parse():
+        return await asyncio.gather(*[
+            executor.run(element_text, body, AdtPulsedotcom.ALARM_STATE)
+            for _ in range(8)])
+
+    assert asyncio.run(parse()) == ['Armed Stay.\xa0All Quiet.'] * 8
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        ParseExecutor('gpu')
+
+
+def test_parse_farm():
+    with open(os.path.join(FIXTURES, 'summary_message.html'), 'rb') as f:
+        body = f.read()
+    farm = ParseFarm(max_workers=2)
+    summary = asyncio.run(farm.parse_summary(body))
+    assert summary.state == 'Disarmed.\xa0All Quiet.'
+    assert summary.message == 'Your arm command was sent. Please wait.'
+    assert len(summary.zones) == 10
+
+
+def test_client_parses_with_the_farm_parser():
+    pytest.importorskip('lxml')
+    farm = ParseFarm(max_workers=1, parser='lxml')
+    assert AdtPulsedotcom('user', 'pass', parse_executor=farm).parser.name == \
+        'lxml'
+    # A parser given to the client itself wins.
+    assert AdtPulsedotcom('user', 'pass', parser='html.parser',
+                          parse_executor=farm).parser.name == 'html.parser'
+    assert AdtPulsedotcom('user', 'pass').parser.name == 'html.parser'
+
+
+def test_executor_shared_across_event_loops():
+    with open(os.path.join(FIXTURES, 'summary_armed_stay.html'), 'rb') as f:
+        body = f.read()
+    executor = ParseExecutor(THREAD, max_workers=2, max_pending=1)
+
+    async def parse():
+        return await asyncio.gather(*[
+            executor.run(element_text, body, AdtPulsedotcom.ALARM_STATE)
+            for _ in range(4)])
+
+    # Each asyncio.run has a loop of its own and waits on the semaphore.
+    for _ in range(2):
+        assert asyncio.run(parse()) == ['Armed Stay.\xa0All Quiet.'] * 4
@@ -0,0 +1,83 @@
+import asyncio
+
+from pyadtpulsedotcom.keepalive import KeepaliveScheduler
+
+
+class FakeClient(object):
+    """Session that idles out after session_timeout seconds."""
+
+    def __init__(self, session_timeout, latency=0):
+        self.session_timeout = session_timeout
+        self.latency = latency
+        self.last_activity = asyncio.get_running_loop().time()
+        self.pings = []
+        self.late = 0
+
+    async def async_keepalive(self):
+        now = asyncio.get_running_loop().time()
+        if now - self.last_activity >= self.session_timeout:
+            self.late += 1
+        self.pings.append(now)
+        await asyncio.sleep(self.latency)
+        self.last_activity = now
+        return True
+
+
+def test_sessions_refreshed_before_timeout():
+    async def run():
+        scheduler = KeepaliveScheduler(margin=0.05)
+        clients = [FakeClient(0.1 + i * 0.005) for i in range(20)]
+        for client in clients:
+            scheduler.add(client)
+        await asyncio.sleep(0.5)
+        await scheduler.close()
+        return clients
+
+    for client in asyncio.run(run()):
+        assert len(client.pings) >= 2
+        assert client.late == 0
+
+
+def test_slow_refresh_does_not_delay_others():
+    async def run():
+        scheduler = KeepaliveScheduler(margin=0.05)
+        slow = FakeClient(0.1, latency=1)
+        clients = [FakeClient(0.1) for _ in range(5)]
+        for client in [slow] + clients:
+            scheduler.add(client)
+        await asyncio.sleep(0.3)
+        await scheduler.close()
+        return slow, clients
+
+    slow, clients = asyncio.run(run())
+    assert len(slow.pings) == 1
+    for client in clients:
+        assert len(client.pings) >= 2
+        assert client.late == 0
+
+
+def test_active_client_not_pinged():
+    async def run():
+        scheduler = KeepaliveScheduler(margin=0.02)
+        client = FakeClient(0.1)
+        scheduler.add(client)
+        for _ in range(10):
+            await asyncio.sleep(0.02)
+            client.last_activity = asyncio.get_running_loop().time()
+        await scheduler.close()
+        return client
+
+    assert asyncio.run(run()).pings == []
+
+
+def test_removed_client_not_pinged():
+    async def run():
+        scheduler = KeepaliveScheduler(margin=0.02)
+        client = FakeClient(0.05)
+        scheduler.add(client)
+        scheduler.remove(client)
+        await asyncio.sleep(0.1)
+        await scheduler.close()
+        return client
+
+    assert asyncio.run(run()).pings == []
@@ -0,0 +1,109 @@
+import glob
+import os
+
+import pytest
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.parsers import (
+    PARSER_BACKENDS, Zone, element_text, fast_element_text, fast_table_rows,
+    get_parser, parse_summary, summary_fingerprint)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def summary_fixtures():
+    return sorted(os.path.basename(path) for path in
+                  glob.glob(os.path.join(FIXTURES, 'summary_*.html')))
+
+
+@pytest.mark.parametrize('name', sorted(PARSER_BACKENDS))
+@pytest.mark.parametrize('fixture', summary_fixtures())
+def test_backends_agree(name, fixture):
+    try:
+        parser = get_parser(name)
+    except ImportError:
+        pytest.skip('{} is not installed'.format(name))
+    reference = get_parser('html.parser')
+    text = load_fixture(fixture)
+    for element_id in (AdtPulsedotcom.ALARM_STATE,
+                       AdtPulsedotcom.MESSAGE_CONTROL):
+        assert (parser.element_text(text, element_id) ==
+                reference.element_text(text, element_id))
+    assert (parser.table_rows(text, AdtPulsedotcom.ZONES_TABLE) ==
+            reference.table_rows(text, AdtPulsedotcom.ZONES_TABLE))
+
+
+def test_alarm_state():
+    parser = get_parser()
+    text = load_fixture('summary_armed_away.html')
+    assert parser.element_text(text, AdtPulsedotcom.ALARM_STATE) == \
+        'Armed Away.\xa0All Quiet.'
+
+
+def test_missing_element():
+    parser = get_parser()
+    text = load_fixture('signin.html')
+    assert parser.element_text(text, AdtPulsedotcom.ALARM_STATE) is None
+
+
+@pytest.mark.parametrize('fixture', summary_fixtures() + ['signin.html'])
+def test_fast_path_matches_parser(fixture):
+    body = load_fixture(fixture).encode()
+    reference = get_parser('html.parser')
+    for element_id in (AdtPulsedotcom.ALARM_STATE,
+                       AdtPulsedotcom.MESSAGE_CONTROL):
+        assert (element_text(body, element_id) ==
+                reference.element_text(body, element_id))
+    assert (fast_table_rows(body, AdtPulsedotcom.ZONES_TABLE) ==
+            reference.table_rows(body, AdtPulsedotcom.ZONES_TABLE))
+
+
+@pytest.mark.parametrize('body', [
+    b"<div class='a' id='divOrbTextSummary'>Disarmed.<br/>All Quiet.</div>",
+    b'<DIV ID="divOrbTextSummary"><!-- orb -->Armed &amp; Stay</DIV>',
+    b'<div id="divOrbTextSummary"><span>Armed Away.&nbsp;</span>'
+    b'<b>1 Sensor</b> Open.</div><div>Other</div>',
+])
+def test_fast_path_edge_cases(body):
+    reference = get_parser('html.parser')
+    assert (fast_element_text(body, AdtPulsedotcom.ALARM_STATE) ==
+            reference.element_text(body, AdtPulsedotcom.ALARM_STATE))
+
+
+def test_fast_path_falls_back_on_nesting():
+    body = (b'<div id="divOrbTextSummary"><div>Armed Away.</div>'
+            b'<div>All Quiet.</div></div>')
+    assert fast_element_text(body, AdtPulsedotcom.ALARM_STATE) is None
+    assert element_text(body, AdtPulsedotcom.ALARM_STATE) == \
+        'Armed Away.All Quiet.'
+
+
+def test_parse_summary():
+    summary = parse_summary(
+        load_fixture('summary_disarmed_open.html').encode())
+    assert summary.state == 'Disarmed.\xa01 Sensor Open.'
+    assert summary.message is None
+    assert len(summary.zones) == 10
+    assert summary.zones[1] == Zone('Back Door', 'Zone 2', 'Open')
+
+
+def test_parse_summary_signin_page():
+    summary = parse_summary(load_fixture('signin.html').encode())
+    assert summary == (None, None, ())
+
+
+def test_summary_fingerprint():
+    body = load_fixture('summary_disarmed.html').encode()
+    fingerprint = summary_fingerprint(body)
+    # Recent history is outside the summary, so it does not count.
+    assert summary_fingerprint(
+        body.replace(b'Front Door Closed', b'Front Door Opened')) == fingerprint
+    assert summary_fingerprint(
+        load_fixture('summary_disarmed_open.html').encode()) != fingerprint
+    assert summary_fingerprint(
+        load_fixture('signin.html').encode()) is None
@@ -0,0 +1,101 @@
+import asyncio
+
+from pyadtpulsedotcom.polling import AdaptivePollScheduler, PollScheduler
+
+
+class FakeClient(object):
+    """Counts polls and can pretend a watcher is behind."""
+
+    def __init__(self, state='Disarmed.\xa0All Quiet.'):
+        self.polls = 0
+        self.ready = True
+        self.state = state
+        self.last_command = 0
+        self.last_change = 0
+
+    async def async_update(self):
+        self.polls += 1
+
+    def watchers_ready(self):
+        return self.ready
+
+
+def test_clients_polled_on_interval():
+    async def run():
+        scheduler = PollScheduler(interval=0.05)
+        clients = [FakeClient() for _ in range(20)]
+        for client in clients:
+            scheduler.add(client)
+        await asyncio.sleep(0.22)
+        await scheduler.close()
+        return clients
+
+    for client in asyncio.run(run()):
+        assert 4 <= client.polls <= 6
+
+
+def test_slow_watcher_holds_back_its_client():
+    async def run():
+        scheduler = PollScheduler(interval=0.02)
+        slow, fast = FakeClient(), FakeClient()
+        scheduler.add(slow)
+        scheduler.add(fast)
+        await asyncio.sleep(0.01)
+        slow.ready = False
+        await asyncio.sleep(0.1)
+        held = slow.polls
+        slow.ready = True
+        scheduler.resume(slow)
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+        return held, slow.polls, fast.polls
+
+    held, polls, fast_polls = asyncio.run(run())
+    assert held == 1
+    assert polls == 2
+    assert fast_polls >= 5
+
+
+def test_poll_soon_and_remove():
+    async def run():
+        scheduler = PollScheduler(interval=10)
+        client = FakeClient()
+        scheduler.add(client)
+        await asyncio.sleep(0.01)
+        scheduler.poll_soon(client)
+        await asyncio.sleep(0.01)
+        polls = client.polls
+        scheduler.remove(client)
+        scheduler.poll_soon(client)
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+        return polls, client.polls
+
+    assert asyncio.run(run()) == (2, 2)
+
+
+def test_adaptive_interval_backs_off_when_stable():
+    scheduler = AdaptivePollScheduler(min_interval=5, max_interval=60)
+    client = FakeClient()
+    client.last_change = 1
+    delays = [scheduler.delay(client, now=1000) for _ in range(6)]
+    assert delays == [5, 10, 20, 40, 60, 60]
+
+    # A change found by the last poll starts over.
+    client.last_change = 1000
+    assert scheduler.delay(client, now=1000) == 5
+    assert scheduler.delay(client, now=1005) == 10
+
+
+def test_adaptive_interval_fast_during_transitions():
+    scheduler = AdaptivePollScheduler(min_interval=5, max_interval=60,
+                                      command_period=30)
+    client = FakeClient('Arming Away.\xa0Exit delay in progress.')
+    assert [scheduler.delay(client, now=100) for _ in range(3)] == [5, 5, 5]
+
+    client.state = 'Armed Away.\xa0All Quiet.'
+    client.last_command = 100
+    assert scheduler.delay(client, now=120) == 5
+    assert scheduler.delay(client, now=140) == 10
+    assert not scheduler.transitioning('Disarmed.\xa0All Quiet.')
+    assert scheduler.transitioning('Disarming.')
@@ -0,0 +1,528 @@
+import asyncio
+import os
+from http.cookies import SimpleCookie
+
+import aiohttp
+import pytest
+from yarl import URL
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.changes import StateChange, ZoneChange
+from pyadtpulsedotcom.parsers import Zone
+from pyadtpulsedotcom.polling import PollScheduler
+from pyadtpulsedotcom.retry import RetryPolicy
+from pyadtpulsedotcom.session_store import FileSessionStore
+from pyadtpulsedotcom.transport import ReplayTransport
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+CONTEXT_PATH = '/myhome/13.0.0-153'
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class FakeResponse(object):
+    """Just enough of aiohttp.ClientResponse for the client."""
+
+    def __init__(self, url, body, status=200, headers=None, cookies=None):
+        self.url = URL(url)
+        self.status = status
+        self.headers = headers or {}
+        self.cookies = SimpleCookie(cookies or {})
+        self.history = ()
+        self._body = body
+
+    async def read(self):
+        return self._body
+
+    async def text(self):
+        return self._body.decode()
+
+    async def release(self):
+        pass
+
+
+class FakeSession(object):
+    """Serves the sign-in and summary pages and counts the requests made."""
+
+    def __init__(self, body, latency=0.01, fail=False, sessions=None):
+        """
+        :param sessions: Valid session ids, None to accept any session
+        """
+        self.body = body
+        self.latency = latency
+        self.fail = fail
+        self.sessions = sessions
+        self.requests = []
+        self._cookie_jar = None
+
+    @property
+    def cookie_jar(self):
+        # Created lazily, aiohttp needs a running loop for it.
+        if self._cookie_jar is None:
+            self._cookie_jar = aiohttp.CookieJar()
+        return self._cookie_jar
+
+    async def request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise aiohttp.ClientConnectionError()
+        cookie = self.cookie_jar.filter_cookies(URL(url)).get('JSESSIONID')
+        valid = self.sessions is None or (
+            cookie is not None and cookie.value in self.sessions)
+        if url.endswith(AdtPulsedotcom.LOGIN_PATH):
+            if method == 'GET' or not valid:
+                # Like the portal, hand out a new session on the sign-in
+                # page and when there is no valid one.
+                session = 'session{}'.format(len(self.requests))
+                if self.sessions is not None:
+                    self.sessions.add(session)
+                cookie = SimpleCookie({'JSESSIONID': session})
+                cookie['JSESSIONID']['path'] = '/'
+                self.cookie_jar.update_cookies(cookie, URL(url))
+            if method == 'POST':
+                return FakeResponse(url, b'', 302, {
+                    'Location': CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH})
+            return FakeResponse(url, load_fixture('signin.html'))
+        if not valid:
+            return FakeResponse(url, b'', 302, {'Location': CONTEXT_PATH +
+                                                AdtPulsedotcom.LOGIN_PATH})
+        return FakeResponse(url, self.body)
+
+
+def make_client(websession, logged_in=True, **kwargs):
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    client = AdtPulsedotcom('user', 'pass', websession, **kwargs)
+    if logged_in:
+        client._login_info = {'sessionkey': 'session'}
+    return client
+
+
+def test_concurrent_updates_share_one_request():
+    websession = FakeSession(load_fixture('summary_armed_away.html'))
+    client = make_client(websession)
+
+    async def update():
+        return await asyncio.gather(
+            *[client.async_update() for _ in range(100)])
+
+    outcomes = asyncio.run(update())
+    assert len(websession.requests) == 1
+    assert all(outcomes)
+    assert client.state == 'Armed Away.\xa0All Quiet.'
+
+
+def test_sequential_updates_refresh():
+    websession = FakeSession(load_fixture('summary_disarmed.html'), 0)
+    client = make_client(websession)
+
+    async def update():
+        await client.async_update()
+        await client.async_update()
+
+    asyncio.run(update())
+    assert len(websession.requests) == 2
+
+
+def test_unchanged_summary_is_not_parsed():
+    websession = FakeSession(load_fixture('summary_disarmed.html'), 0)
+    client = make_client(websession)
+
+    async def update():
+        await client.async_update()
+        client.state = 'Stale'
+        await client.async_update()
+        # The second poll kept the state instead of parsing the page again.
+        assert client.state == 'Stale'
+        websession.body = load_fixture('summary_disarmed_open.html')
+        await client.async_update()
+
+    asyncio.run(update())
+    assert client.change_stats == {'hits': 1, 'misses': 2}
+    assert client.state == 'Disarmed.\xa01 Sensor Open.'
+
+
+def test_concurrent_logins_share_one_login():
+    websession = FakeSession(load_fixture('summary_disarmed.html'))
+    client = make_client(websession)
+
+    async def login():
+        return await asyncio.gather(*[client.async_login() for _ in range(50)])
+
+    assert all(asyncio.run(login()))
+    assert [method for method, _ in websession.requests] == ['GET', 'POST']
+
+
+def test_failed_login_is_not_retried_at_once():
+    websession = FakeSession(b'', latency=0, fail=True)
+    client = make_client(websession)
+
+    async def login():
+        return [await client.async_login(), await client.async_login()]
+
+    assert asyncio.run(login()) == [False, False]
+    assert len(websession.requests) == 1
+
+
+def test_rejected_credentials_are_not_retried_at_once():
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    signin = AdtPulsedotcom.ADTPULSEDOTCOM_URL + CONTEXT_PATH + \
+        AdtPulsedotcom.LOGIN_PATH
+    transport = ReplayTransport()
+    transport.add('GET', signin, body=load_fixture('signin.html'),
+                  headers={'Set-Cookie': 'JSESSIONID=A1B2C3D4E5; Path=/'})
+    transport.add('POST', signin, 302, headers={
+        'Location': CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH + '?e=ns'})
+    client = AdtPulsedotcom('user', 'wrong', transport=transport)
+
+    async def login():
+        loop = asyncio.get_running_loop()
+        first = await client.async_login()
+        start = loop.time()
+        second = await client.async_login()
+        return first, second, loop.time() - start
+
+    first, second, elapsed = asyncio.run(login())
+    assert (first, second) == (False, False)
+    assert elapsed < 0.1
+    assert [method for method, _, _ in transport.requests] == ['GET', 'POST']
+    assert client._login_info is None
+
+
+def test_session_restored_from_store(tmp_path):
+    store = FileSessionStore(str(tmp_path / 'sessions'))
+    sessions = set()
+    body = load_fixture('summary_disarmed.html')
+
+    first = FakeSession(body, 0, sessions=sessions)
+    assert asyncio.run(make_client(
+        first, logged_in=False, session_store=store).async_update())
+    assert [method for method, _ in first.requests] == ['GET', 'POST', 'GET']
+
+    # A restarted process reuses the stored session without logging in.
+    second = FakeSession(body, 0, sessions=sessions)
+    client = make_client(second, logged_in=False, session_store=store)
+    assert asyncio.run(client.async_update())
+    assert [url for _, url in second.requests] == \
+        [client.DASHBOARD_URL, client.DASHBOARD_URL]
+
+
+def test_invalid_stored_session_logs_in(tmp_path):
+    store = FileSessionStore(str(tmp_path / 'sessions'))
+    body = load_fixture('summary_disarmed.html')
+    asyncio.run(make_client(FakeSession(body, 0, sessions=set()),
+                            logged_in=False, session_store=store
+                            ).async_update())
+
+    # The portal forgot the session, e.g. after it expired.
+    websession = FakeSession(body, 0, sessions=set())
+    client = make_client(websession, logged_in=False, session_store=store)
+    assert asyncio.run(client.async_update())
+    # The stale session cookie is still held, so no sign-in page is fetched.
+    assert [method for method, _ in websession.requests] == \
+        ['GET', 'POST', 'GET']
+    assert store.load('user')['JSESSIONID'].value == 'session2'
+
+
+def test_login_skips_signin_page_with_session_cookie():
+    websession = FakeSession(load_fixture('summary_disarmed.html'), 0)
+    client = make_client(websession, logged_in=False)
+
+    async def login_twice():
+        await client.async_login()
+        await client.async_login()
+
+    asyncio.run(login_twice())
+    assert [method for method, _ in websession.requests] == \
+        ['GET', 'POST', 'POST']
+    assert client._login_info == {'sessionkey': 'session1'}
+
+
+def test_session_timeout_learned_from_expiry():
+    client = make_client(FakeSession(b'', 0))
+
+    async def idle_for(idle, expired):
+        loop = asyncio.get_running_loop()
+        client.last_activity = loop.time() - idle
+        if expired:
+            client._observe_expiry()
+        else:
+            client._mark_active()
+
+    asyncio.run(idle_for(300, expired=True))
+    assert client.session_timeout == pytest.approx(150, abs=1)
+    # The estimate moves to the middle of what survived and what did not.
+    asyncio.run(idle_for(200, expired=False))
+    assert client.session_timeout == pytest.approx(200, abs=1)
+    asyncio.run(idle_for(260, expired=True))
+    assert client.session_timeout == pytest.approx(230, abs=1)
+    # What survived is remembered across logins.
+    asyncio.run(client.async_login())
+    asyncio.run(idle_for(240, expired=True))
+    assert client.session_timeout == pytest.approx(220, abs=1)
+    # A session expiring sooner than one survived means a shorter timeout.
+    asyncio.run(idle_for(150, expired=True))
+    assert client.session_timeout == pytest.approx(75, abs=1)
+
+
+def test_summary_error_keeps_the_session():
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    summary = AdtPulsedotcom.ADTPULSEDOTCOM_URL + CONTEXT_PATH + \
+        AdtPulsedotcom.DASHBOARD_PATH
+    transport = ReplayTransport()
+    transport.add('GET', summary, 503, b'<html>Service Unavailable</html>')
+    transport.add('GET', summary, body=load_fixture('summary_disarmed.html'))
+    client = AdtPulsedotcom('user', 'pass', transport=transport,
+                            retry_policy=RetryPolicy(base_delay=0.01))
+    client._login_info = {'sessionkey': 'session'}
+
+    outcome = asyncio.run(client.async_update())
+    assert outcome and outcome.attempts == 2
+    # Retried with the same session, without logging in again.
+    assert [method for method, _, _ in transport.requests] == ['GET', 'GET']
+    assert client._login_info == {'sessionkey': 'session'}
+    assert client.state == 'Disarmed.\xa0All Quiet.'
+
+
+def test_keepalive_needs_a_successful_response():
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    keepalive = AdtPulsedotcom.ADTPULSEDOTCOM_URL + CONTEXT_PATH + \
+        AdtPulsedotcom.KEEPALIVE_PATH
+    transport = ReplayTransport()
+    transport.add('POST', keepalive, 503)
+    transport.add('POST', keepalive, 404)
+    transport.add('POST', keepalive, 200)
+    client = AdtPulsedotcom('user', 'pass', transport=transport)
+    client._login_info = {'sessionkey': 'session'}
+    timeout = client.session_timeout
+
+    async def keepalive():
+        client.last_activity = asyncio.get_running_loop().time() - 900
+        return [await client.async_keepalive() for _ in range(3)]
+
+    assert asyncio.run(keepalive()) == [False, False, True]
+    # Neither the error nor the missing page triggered a rediscovery.
+    assert [URL(url).path for _, url, _ in transport.requests] == \
+        [CONTEXT_PATH + AdtPulsedotcom.KEEPALIVE_PATH] * 3
+    assert client.session_timeout == pytest.approx(max(timeout, 900), abs=1)
+
+
+def test_managed_sessions_share_connection_pool():
+    async def run():
+        async with AdtPulsedotcom('a', 'pass') as first, \
+                AdtPulsedotcom('b', 'pass') as second:
+            first_session = first._transport.websession
+            second_session = second._transport.websession
+            assert first_session is not second_session
+            assert first_session.cookie_jar is not second_session.cookie_jar
+            assert first_session.connector is second_session.connector
+            connector = first_session.connector
+        assert first._transport is None
+        assert connector.closed
+
+    asyncio.run(run())
+
+
+def test_managed_session_needs_async_with():
+    client = AdtPulsedotcom('user', 'pass')
+    with pytest.raises(RuntimeError, match='async with'):
+        asyncio.run(client.async_update())
+
+
+def replay_client(scenario):
+    """Client on a recorded scenario that has to discover the contextPath."""
+    transport = ReplayTransport.load(
+        os.path.join(FIXTURES, 'scenario_{}.json'.format(scenario)))
+    client = AdtPulsedotcom('user', 'pass', transport=transport,
+                            retry_policy=RetryPolicy(base_delay=0.01))
+    return client, transport
+
+
+def replayed(transport):
+    return [(method, URL(url).path) for method, url, _ in transport.requests]
+
+
+def test_replay_login_and_update():
+    client, transport = replay_client('login')
+    assert asyncio.run(client.async_update())
+    assert client.state == 'Disarmed.\xa0All Quiet.'
+    assert client._login_info == {'sessionkey': 'A1B2C3D4E5'}
+    # The summary page the login redirects to is not downloaded.
+    assert replayed(transport) == [
+        ('GET', '/'),
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH),
+        ('POST', CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH),
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH)]
+
+
+def test_missing_sync_check_turns_it_off():
+    transport = ReplayTransport.load(
+        os.path.join(FIXTURES, 'scenario_login.json'))
+    client = AdtPulsedotcom('user', 'pass', transport=transport,
+                            sync_check=True)
+    assert asyncio.run(client.async_update())
+    # The 404 did not send the client looking for a new contextPath.
+    assert replayed(transport) == [
+        ('GET', '/'),
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH),
+        ('POST', CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH),
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.SYNC_CHECK_PATH),
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH)]
+    assert not client._sync_check
+
+
+def test_replay_session_expired_logs_in_again():
+    client, transport = replay_client('session_expired')
+
+    async def poll_twice():
+        return [await client.async_update(), await client.async_update()]
+
+    first, second = asyncio.run(poll_twice())
+    assert first and second
+    assert second.attempts == 2
+    # The page read after logging in again, not the one from before.
+    assert client.state == 'Disarmed.\xa01 Sensor Open.'
+    assert len(client.zones) == 10
+    assert client.zones[1] == Zone('Back Door', 'Zone 2', 'Open')
+    # The session cookie is still held, so the sign-in page is skipped.
+    assert replayed(transport)[-3:] == [
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH),
+        ('POST', CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH),
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH)]
+
+
+def test_replay_arm_away_refreshes_state():
+    client, transport = replay_client('arm_away')
+
+    async def arm():
+        await client.async_login()
+        return await client.async_alarm_arm_away()
+
+    assert asyncio.run(arm())
+    assert client.state.startswith('Arming Away.')
+    assert asyncio.run(client.async_update())
+    assert client.state == 'Armed Away.\xa0All Quiet.'
+    assert replayed(transport)[3] == \
+        ('POST', CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH)
+
+
+def test_command_without_message_is_sent_once():
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    summary = AdtPulsedotcom.ADTPULSEDOTCOM_URL + CONTEXT_PATH + \
+        AdtPulsedotcom.DASHBOARD_PATH
+    transport = ReplayTransport()
+    # The portal took the command and answered with just the orb.
+    transport.add('POST', summary, body=load_fixture('summary_arming.html'))
+    transport.add('GET', summary, body=load_fixture('summary_arming.html'))
+    client = AdtPulsedotcom('user', 'pass', transport=transport,
+                            retry_policy=RetryPolicy(base_delay=0.01))
+    client._login_info = {'sessionkey': 'session'}
+
+    outcome = asyncio.run(client.async_alarm_arm_away())
+    assert outcome and outcome.attempts == 1
+    assert outcome.result == ''
+    assert [method for method, _, _ in transport.requests] == ['POST', 'GET']
+    assert client._login_info == {'sessionkey': 'session'}
+    assert client.state.startswith('Arming Away.')
+
+
+def test_command_resent_after_expired_session():
+    AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH = CONTEXT_PATH
+    base = AdtPulsedotcom.ADTPULSEDOTCOM_URL + CONTEXT_PATH
+    transport = ReplayTransport()
+    transport.add('POST', base + AdtPulsedotcom.DASHBOARD_PATH, 302,
+                  headers={'Location': CONTEXT_PATH + AdtPulsedotcom.LOGIN_PATH})
+    transport.add('POST', base + AdtPulsedotcom.DASHBOARD_PATH,
+                  body=load_fixture('summary_message.html'))
+    transport.add('GET', base + AdtPulsedotcom.LOGIN_PATH,
+                  headers={'Set-Cookie': 'JSESSIONID=A1B2C3D4E5; Path=/'})
+    transport.add('POST', base + AdtPulsedotcom.LOGIN_PATH, 302, headers={
+        'Location': CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH})
+    transport.add('GET', base + AdtPulsedotcom.DASHBOARD_PATH,
+                  body=load_fixture('summary_arming.html'))
+    client = AdtPulsedotcom('user', 'pass', transport=transport,
+                            retry_policy=RetryPolicy(base_delay=0.01))
+    client._login_info = {'sessionkey': 'session'}
+
+    outcome = asyncio.run(client.async_alarm_arm_away())
+    assert outcome and outcome.attempts == 2
+    assert 'command' in outcome.result
+    assert [(method, URL(url).path.rsplit('/', 1)[-1])
+            for method, url, _ in transport.requests] == [
+        ('POST', 'summary.jsp'), ('GET', 'signin.jsp'),
+        ('POST', 'signin.jsp'), ('POST', 'summary.jsp'),
+        ('GET', 'summary.jsp')]
+
+
+def test_replay_version_rolled_rebases():
+    client, transport = replay_client('version_rolled')
+
+    async def poll_twice():
+        return [await client.async_update(), await client.async_update()]
+
+    assert all(asyncio.run(poll_twice()))
+    assert AdtPulsedotcom.ADTPULSEDOTCOM_CONTEXT_PATH == '/myhome/14.0.0-22'
+    assert client.state == 'Armed Stay.\xa0All Quiet.'
+    assert replayed(transport)[-1] == \
+        ('GET', '/myhome/14.0.0-22' + AdtPulsedotcom.DASHBOARD_PATH)
+
+
+def test_watchers_share_one_poll_loop():
+    client, transport = replay_client('login')
+    client._poll_scheduler = scheduler = PollScheduler(interval=0.02)
+
+    async def first_change():
+        async for change in client.watch():
+            return change
+
+    async def run():
+        changes = await asyncio.gather(*[first_change() for _ in range(100)])
+        await asyncio.sleep(0.05)
+        await scheduler.close()
+        return changes
+
+    changes = asyncio.run(run())
+    assert set(changes) == {StateChange(None, 'Disarmed.\xa0All Quiet.')}
+    assert replayed(transport).count(
+        ('GET', CONTEXT_PATH + AdtPulsedotcom.DASHBOARD_PATH)) == 1
+    # Polling stopped with the last watcher.
+    assert len(scheduler) == 0
+
+
+def test_listeners_get_one_batch_per_update():
+    client, _ = replay_client('session_expired')
+    client._poll_scheduler = scheduler = PollScheduler(interval=10)
+    batches = []
+    zone_batches = []
+    async_batches = []
+
+    def broken(changes):
+        raise RuntimeError('listener bug')
+
+    async def slow(changes):
+        await asyncio.sleep(0)
+        async_batches.append(changes)
+
+    async def run():
+        client.add_listener(batches.append)
+        client.add_listener(zone_batches.append, kinds=(ZoneChange,))
+        client.add_listener(broken)
+        remove = client.add_listener(slow)
+        assert await client.async_update()
+        remove()
+        # Expires, logs in again and finds a door opened.
+        assert await client.async_update()
+        assert await client.async_update()
+        await asyncio.sleep(0)
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert len(batches) == 2
+    assert batches[1] == [
+        StateChange('Disarmed.\xa0All Quiet.', 'Disarmed.\xa01 Sensor Open.'),
+        ZoneChange('Zone 2', 'Back Door', 'Closed', 'Open')]
+    assert zone_batches[1] == batches[1][1:]
+    assert len(async_batches) == 1
@@ -0,0 +1,59 @@
+import asyncio
+
+import aiohttp
+
+from pyadtpulsedotcom.retry import DEADLINE, EXHAUSTED, SUCCESS, RetryPolicy
+
+
+def run_attempts(policy, results):
+    calls = []
+
+    async def attempt():
+        calls.append(None)
+        result = results[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return asyncio.run(policy.run(attempt)), len(calls)
+
+
+def test_success_after_retries():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    outcome, calls = run_attempts(
+        policy, [False, aiohttp.ClientError(), 'ok'])
+    assert outcome
+    assert outcome.reason == SUCCESS
+    assert outcome.result == 'ok'
+    assert outcome.attempts == calls == 3
+
+
+def test_empty_result_is_success():
+    outcome, calls = run_attempts(RetryPolicy(), [''])
+    assert outcome.success and calls == 1
+
+
+def test_exhausted():
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    outcome, calls = run_attempts(policy, [None] * 10)
+    assert not outcome
+    assert outcome.reason == EXHAUSTED
+    assert calls == 4
+
+
+def test_deadline():
+    policy = RetryPolicy(max_attempts=10, base_delay=1, deadline=0.05)
+
+    async def attempt():
+        await asyncio.sleep(1)
+
+    outcome = asyncio.run(policy.run(attempt))
+    assert outcome.reason == DEADLINE
+    assert outcome.attempts == 1
+    assert isinstance(outcome.error, asyncio.TimeoutError)
+
+
+def test_backoff_bounds():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    for attempt in range(1, 10):
+        assert 0 <= policy.backoff(attempt) <= min(5, 2 ** (attempt - 1))
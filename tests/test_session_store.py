@@ -0,0 +1,79 @@
+import os
+import time
+from http.cookies import SimpleCookie
+
+from pyadtpulsedotcom.session_store import FileSessionStore
+
+
+def cookies(session, max_age=None):
+    jar = SimpleCookie({'JSESSIONID': session, 'lang': 'en'})
+    if max_age is not None:
+        jar['JSESSIONID']['max-age'] = max_age
+    return jar.values()
+
+
+def test_accounts_are_kept_apart(tmp_path):
+    directory = str(tmp_path / 'sessions')
+    store = FileSessionStore(directory)
+    for index in range(50):
+        store.save('user{}@example.com'.format(index),
+                   cookies('session{}'.format(index)))
+
+    # A second worker sharing the directory adds and drops its own accounts.
+    other = FileSessionStore(directory)
+    other.save('other@example.com', cookies('other'))
+    other.clear('user0@example.com')
+
+    assert store.load('user0@example.com') is None
+    for index in range(1, 50):
+        loaded = store.load('user{}@example.com'.format(index))
+        assert loaded['JSESSIONID'].value == 'session{}'.format(index)
+        assert loaded['lang'].value == 'en'
+    assert store.load('other@example.com')['JSESSIONID'].value == 'other'
+    # One private file per account, no temporary files left behind.
+    files = os.listdir(directory)
+    assert len(files) == 50
+    assert all(name.endswith('.json') for name in files)
+    assert os.stat(os.path.join(directory, files[0])).st_mode & 0o077 == 0
+
+
+def test_expired_cookies_are_dropped(tmp_path):
+    store = FileSessionStore(str(tmp_path / 'sessions'))
+    store.save('user', cookies('expired', max_age=-1))
+    assert 'JSESSIONID' not in store.load('user')
+    store.save('user', cookies('valid', max_age=3600))
+    assert store.load('user')['JSESSIONID'].value == 'valid'
+
+
+def test_missing_and_corrupt_files(tmp_path):
+    store = FileSessionStore(str(tmp_path / 'sessions'))
+    assert store.load('user') is None
+    store.clear('user')
+    store.save('user', cookies('session'))
+    with open(store._path('user'), 'w') as f:
+        f.write('[{"name": ')
+    assert store.load('user') is None
+
+
+def test_unwritable_directory_is_ignored(tmp_path):
+    blocker = tmp_path / 'sessions'
+    blocker.write_text('not a directory')
+    store = FileSessionStore(str(blocker))
+    store.save('user', cookies('session'))
+    assert store.load('user') is None
+
+
+def test_save_time_does_not_grow_with_accounts(tmp_path):
+    store = FileSessionStore(str(tmp_path / 'sessions'))
+
+    def timed_saves(first, count):
+        start = time.perf_counter()
+        for index in range(first, first + count):
+            store.save('user{}'.format(index), cookies('session'))
+        return time.perf_counter() - start
+
+    early = timed_saves(0, 100)
+    timed_saves(100, 900)
+    late = timed_saves(1000, 100)
+    # A single JSON file for every account made this grow tenfold.
+    assert late < early * 4
@@ -0,0 +1,238 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from pyadtpulsedotcom import AdtPulsedotcom
+from pyadtpulsedotcom.changes import StateChange, ZoneChange
+from pyadtpulsedotcom.keepalive import KeepaliveScheduler
+from pyadtpulsedotcom.polling import AdaptivePollScheduler, PollScheduler
+from pyadtpulsedotcom.retry import RetryPolicy
+from pyadtpulsedotcom.session_store import FileSessionStore
+from pyadtpulsedotcom.stub_portal import StubPortal
+from pyadtpulsedotcom.transport import HttpxTransport
+
+
+async def portal_client(portal, websession, password='pass', **kwargs):
+    client = AdtPulsedotcom('user', password, websession,
+                            retry_policy=RetryPolicy(base_delay=0.01),
+                            **kwargs)
+    client.ADTPULSEDOTCOM_URL = portal.url
+    return client
+
+
+def test_login_update_and_arm():
+    async def run():
+        async with StubPortal(exit_delay=0.05) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession)
+            assert await client.async_update()
+            assert client.state == 'Disarmed.\xa0All Quiet.'
+            assert len(client.zones) == 6
+
+            assert await client.async_alarm_arm_away()
+            assert client.state.startswith('Arming Away.')
+            await asyncio.sleep(0.05)
+            assert await client.async_update()
+            assert client.state == 'Armed Away.\xa0All Quiet.'
+            assert portal.stats['login'] == 1
+            assert portal.state('user') == client.state
+
+    asyncio.run(run())
+
+
+def test_httpx_transport_logs_in(tmp_path):
+    pytest.importorskip('httpx')
+
+    async def run():
+        store = FileSessionStore(str(tmp_path / 'sessions'))
+        async with StubPortal(session_timeout=0.1) as portal:
+            transport = HttpxTransport()
+            client = await portal_client(portal, None, session_store=store,
+                                         transport=transport)
+            assert await client.async_update()
+            assert client.state == 'Disarmed.\xa0All Quiet.'
+            assert await client.async_alarm_arm_away()
+            await transport.close()
+
+            # A restarted process reuses the stored session cookie.
+            transport = HttpxTransport()
+            client = await portal_client(portal, None, session_store=store,
+                                         transport=transport)
+            assert await client.async_update()
+            assert portal.stats['login'] == 1
+
+            # An expired session logs in again on the held session cookie.
+            await asyncio.sleep(0.15)
+            assert await client.async_update()
+            await transport.close()
+            return portal.stats
+
+    stats = asyncio.run(run())
+    assert stats['signin'] == 1
+    assert stats['login'] == 2
+    assert stats['expired'] == 1
+    assert stats['command'] == 1
+
+
+def test_expired_session_logs_in_again():
+    async def run():
+        async with StubPortal(session_timeout=0.05) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession)
+            assert await client.async_update()
+            await asyncio.sleep(0.1)
+            outcome = await client.async_update()
+            assert outcome and outcome.attempts == 2
+            assert portal.stats['expired'] == 1
+            assert portal.stats['login'] == 2
+            # The held session cookie is reused for the second login.
+            assert portal.stats['signin'] == 1
+
+    asyncio.run(run())
+
+
+def test_keepalive_learns_the_session_timeout():
+    async def run():
+        keepalive = KeepaliveScheduler(margin=0.03)
+        async with StubPortal(session_timeout=0.3) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession,
+                                         keepalive=keepalive)
+            client.MIN_SESSION_TIMEOUT = 0
+            client.session_timeout = 1.0
+            assert await client.async_update()
+            await asyncio.sleep(2)
+            learning = dict(portal.stats)
+            await asyncio.sleep(1)
+            await keepalive.close()
+            return learning, portal.stats, client.session_timeout
+
+    learning, stats, timeout = asyncio.run(run())
+    assert learning['expired'] <= 3
+    # Once learned, the pings keep the one session alive.
+    assert stats['expired'] == learning['expired']
+    assert stats['login'] == learning['login']
+    assert stats['keepalive'] > learning['keepalive']
+    assert timeout < 0.3 + 0.03
+
+
+def test_rejected_login_and_errors():
+    async def run():
+        async with StubPortal(accounts={'user': 'secret'}) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession)
+            assert not await client.async_update()
+            # The retries of the update do not post the credentials again.
+            assert portal.stats['login'] == 1
+            assert portal.stats['login_failed'] == 1
+
+        async with StubPortal(error_rate=1) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession)
+            assert not await client.async_update()
+            assert portal.stats['error'] > 0
+
+    asyncio.run(run())
+
+
+def test_rejected_login_is_not_stored(tmp_path):
+    async def run():
+        store = FileSessionStore(str(tmp_path / 'sessions'))
+        async with StubPortal(accounts={'user': 'secret'}) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession,
+                                         session_store=store)
+            assert not await client.async_login()
+            assert store.load('user') is None
+
+            client = await portal_client(portal, websession, 'secret',
+                                         session_store=store)
+            assert await client.async_login()
+            assert store.load('user') is not None
+
+    asyncio.run(run())
+
+
+def test_etag_answers_unchanged_polls():
+    async def run():
+        async with StubPortal(etags=True) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession)
+            for _ in range(3):
+                assert await client.async_update()
+            assert portal.stats['not_modified'] == 2
+            assert client.change_stats == {'hits': 2, 'misses': 1}
+
+    asyncio.run(run())
+
+
+def test_sync_check_fetches_summary_only_on_change():
+    async def run():
+        async with StubPortal(session_timeout=0.2) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession, sync_check=True)
+            for _ in range(3):
+                assert await client.async_update()
+            assert portal.stats['sync_check'] == 3
+            assert portal.stats['summary'] == 1
+
+            portal.set_zone('user', 'Front Door', 'Open')
+            assert await client.async_update()
+            assert portal.stats['summary'] == 2
+            assert client.zones[0].status == 'Open'
+
+            # Sync checks alone let the session idle out.
+            await asyncio.sleep(0.25)
+            outcome = await client.async_update()
+            assert outcome and outcome.attempts == 2
+            assert portal.stats['login'] == 2
+
+    asyncio.run(run())
+
+
+def test_watch_streams_changes():
+    async def run():
+        scheduler = PollScheduler(interval=0.02)
+        async with StubPortal() as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession,
+                                         poll_scheduler=scheduler)
+            changes = []
+            async for change in client.watch():
+                changes.append(change)
+                if getattr(change, 'zone', None) == 'Zone 6':
+                    # The state as first seen is in, now a door opens.
+                    portal.set_zone('user', 'Back Door', 'Open')
+                elif change.old is not None:
+                    break
+            await scheduler.close()
+            return changes, portal.stats['summary']
+
+    changes, summaries = asyncio.run(run())
+    assert changes[0] == StateChange(None, 'Disarmed.\xa0All Quiet.')
+    assert changes[-1] == ZoneChange('Zone 2', 'Back Door', 'Closed', 'Open')
+    assert summaries >= 2
+
+
+def test_adaptive_polling_follows_exit_delay():
+    async def run():
+        scheduler = AdaptivePollScheduler(min_interval=0.02, max_interval=5,
+                                          command_period=0)
+        async with StubPortal(exit_delay=0.1) as portal, \
+                aiohttp.ClientSession() as websession:
+            client = await portal_client(portal, websession,
+                                         poll_scheduler=scheduler)
+            states = []
+            client.add_listener(
+                lambda changes: states.extend(change.new for change in changes),
+                kinds=(StateChange,))
+            await asyncio.sleep(0.05)
+            await client.async_alarm_arm_away()
+            await asyncio.sleep(0.3)
+            await scheduler.close()
+            return states
+
+    assert asyncio.run(run()) == ['Disarmed.\xa0All Quiet.',
+                                  'Arming Away.\xa0Exit delay in progress.',
+                                  'Armed Away.\xa0All Quiet.']
@@ -0,0 +1,80 @@
+import asyncio
+from http.cookies import SimpleCookie
+
+import pytest
+from yarl import URL
+
+from pyadtpulsedotcom.transport import (
+    HttpxTransport, ReplayTransport, TransportError)
+
+PORTAL = 'https://portal.adtpulse.com'
+
+
+def test_replay_serves_in_order():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL + '/a', body=b'first')
+    transport.add('GET', PORTAL + '/a', body=b'second')
+
+    async def run():
+        return [await (await transport.request('GET', PORTAL + '/a')).read()
+                for _ in range(3)]
+
+    assert asyncio.run(run()) == [b'first', b'second', b'second']
+
+
+def test_replay_redirects_and_cookies():
+    transport = ReplayTransport()
+    transport.add('GET', PORTAL, 302, headers=[
+        ('Location', '/myhome/1.0/access/signin.jsp'),
+        ('Set-Cookie', 'JSESSIONID=abc; Path=/')])
+    transport.add('GET', PORTAL + '/myhome/1.0/access/signin.jsp', body=b'ok')
+
+    async def run():
+        unfollowed = await transport.request(
+            'GET', PORTAL, allow_redirects=False)
+        followed = await transport.request('GET', PORTAL)
+        return unfollowed, followed
+
+    unfollowed, followed = asyncio.run(run())
+    assert unfollowed.status == 302
+    assert unfollowed.headers['location'] == '/myhome/1.0/access/signin.jsp'
+    assert followed.status == 200
+    assert followed.url.path == '/myhome/1.0/access/signin.jsp'
+    assert len(followed.history) == 1
+    assert [m.value for m in transport.cookies('portal.adtpulse.com')] == \
+        ['abc']
+
+
+def test_replay_unknown_url_is_404():
+    response = asyncio.run(ReplayTransport().request('GET', PORTAL + '/x'))
+    assert response.status == 404
+
+
+def test_httpx_transport():
+    httpx = pytest.importorskip('httpx')
+
+    def handler(request):
+        if request.url.path == '/fail':
+            raise httpx.ConnectError('refused', request=request)
+        return httpx.Response(
+            302, headers={'Location': '/next',
+                          'Set-Cookie': 'JSESSIONID=abc; Path=/'})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    transport = HttpxTransport(client)
+
+    async def run():
+        response = await transport.request(
+            'GET', PORTAL + '/start', allow_redirects=False)
+        with pytest.raises(TransportError):
+            await transport.request('GET', PORTAL + '/fail')
+        cookie = SimpleCookie({'other': 'value'})
+        transport.update_cookies(cookie, URL(PORTAL))
+        await client.aclose()
+        return response
+
+    response = asyncio.run(run())
+    assert response.status == 302
+    assert response.headers['Location'] == '/next'
+    assert sorted(m.key for m in transport.cookies('portal.adtpulse.com')) == \
+        ['JSESSIONID', 'other']